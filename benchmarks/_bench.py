@@ -0,0 +1,154 @@
+#!/usr/bin/env python3
+
+""" This module contains the helper functions shared by the benchmarks:
+    timing, JSON baselines and regression checks
+"""
+
+import os
+import sys
+import json
+import time
+import platform
+from src import _backends
+
+BASELINES_DIRECTORY = os.path.join(os.path.dirname(os.path.abspath(__file__)), "baselines")
+
+def best_time(func, repeat=3, min_time=0.2):
+    """ Measure the execution time of func
+
+        func is called in a loop until min_time is reached, and this is repeated
+        'repeat' times. The best time is kept (the less disturbed by the system).
+
+        Args:
+            func -- function -- the function to measure, without arguments
+            repeat -- int -- the number of measures
+            min_time -- float -- the minimum duration of a measure, in seconds
+
+        return the best time for one call, in seconds
+    """
+    best = None
+    for _ in range(repeat):
+        calls = 0
+        start = time.perf_counter()
+        elapsed = 0
+        while calls == 0 or elapsed < min_time:
+            func()
+            calls += 1
+            elapsed = time.perf_counter() - start
+        if best is None or elapsed / calls < best:
+            best = elapsed / calls
+    return best
+
+def parse_size(size):
+    """ Convert a size like '64', '4K' or '64M' to bytes
+    """
+    units = {'K': 1 << 10, 'M': 1 << 20, 'G': 1 << 30}
+    size = size.upper()
+    if size[-1] in units:
+        return int(size[:-1]) * units[size[-1]]
+    return int(size)
+
+def environment():
+    """ return a description of the machine running the benchmark
+    """
+    return {
+        'python': platform.python_version(),
+        'implementation': platform.python_implementation(),
+        'machine': platform.machine(),
+        'processor': platform.processor(),
+        'cpus': os.cpu_count(),
+        'backends': _backends.selected_backends(),
+    }
+
+def baseline_path(name):
+    """ return the path of the JSON baseline of a benchmark
+    """
+    return os.path.join(BASELINES_DIRECTORY, name + ".json")
+
+def load_baseline(path):
+    """ Load a JSON baseline
+
+        Args:
+            path -- string -- the path of the baseline
+
+        return the results of the baseline, or None if it doesn't exist
+    """
+    if not os.path.exists(path):
+        return None
+    with open(path) as f:
+        return json.load(f)['results']
+
+def save_baseline(path, results):
+    """ Write the results in a JSON baseline
+
+        Args:
+            path -- string -- the path of the baseline
+            results -- dict -- the results of the benchmark
+    """
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "w") as f:
+        json.dump({'environment': environment(), 'results': results}, f,
+                  indent=2, sort_keys=True)
+
+def compare(results, baseline, threshold):
+    """ Compare the results with the baseline
+
+        The metrics ending by '_per_s' are throughputs (higher is better),
+        the others are durations (lower is better).
+
+        Args:
+            results -- dict -- case -> metric -> value
+            baseline -- dict -- case -> metric -> value
+            threshold -- float -- the accepted regression, 0.2 for 20%
+
+        return the list of regressions: (case, metric, baseline value, value)
+    """
+    regressions = []
+    for case, metrics in sorted(results.items()):
+        for metric, value in sorted(metrics.items()):
+            reference = baseline.get(case, {}).get(metric)
+            if reference is None:
+                continue
+            if metric.endswith('_per_s'):
+                regressed = value < reference * (1 - threshold)
+            else:
+                regressed = value > reference * (1 + threshold)
+            if regressed:
+                regressions.append((case, metric, reference, value))
+    return regressions
+
+def report(name, results, args):
+    """ Print the results, save or check the baseline, and exit
+
+        Args:
+            name -- string -- the name of the benchmark (and of its baseline)
+            results -- dict -- case -> metric -> value
+            args -- argparse.Namespace -- with baseline, save and threshold
+    """
+    path = args.baseline or baseline_path(name)
+    if args.save:
+        save_baseline(path, results)
+        print("baseline written in " + path)
+        return
+
+    baseline = load_baseline(path)
+    if baseline is None:
+        print("no baseline in " + path + " (use --save to create it)")
+        return
+
+    regressions = compare(results, baseline, args.threshold)
+    for case, metric, reference, value in regressions:
+        print("REGRESSION %s %s: %.6g -> %.6g" % (case, metric, reference, value))
+    if regressions:
+        sys.exit(1)
+    print("no regression above %d%%" % (args.threshold * 100))
+
+def add_arguments(parser):
+    """ Add the arguments shared by the benchmarks to an argparse parser
+    """
+    parser.add_argument("--save", action="store_true",
+                        help="write the results as the new baseline")
+    parser.add_argument("--baseline", default=None,
+                        help="path of the JSON baseline (default: benchmarks/baselines/)")
+    parser.add_argument("--threshold", type=float, default=0.2,
+                        help="accepted regression versus the baseline (default: 0.2)")
@@ -0,0 +1,112 @@
+#!/usr/bin/env python3
+
+""" DES benchmark
+
+    Measure the number of blocks ciphered per second with the precomputed
+    subkeys and SP tables, against the step by step rounds (expansion, key
+    mixing, S-boxes, P, and a subkey generated at each round), Triple DES
+    (fused or as 3 DES), the bitsliced engine (ECB and CTR, for some widths),
+    and the cost of the key schedule. Compare the results with a JSON
+    baseline, and exit with an error if a case regressed more than the
+    threshold.
+
+    Usage (from the root of the project):
+        python3 -m benchmarks.bench_des --save        # write the baseline
+        python3 -m benchmarks.bench_des               # check against it
+"""
+
+import os
+import argparse
+from src.DES import (DES, ROTATIONS, IP_TABLES, IPINV_TABLES, permute)
+from src.DESBitslice import DESBitslice
+from src.TripleDES import TripleDES
+from benchmarks._bench import (best_time, report, add_arguments)
+
+BITSLICE_WIDTHS = (64, 256, 1024)
+
+def step_by_step_encrypt(des, block):
+    """ Cipher a block without the precomputed tables and subkeys
+    """
+    block = permute(block, IP_TABLES)
+    left, right = block >> 32, block & 0xffffffff
+    key = des.permuted_key
+    for rotation in ROTATIONS:
+        key, subkey = des.generate_next_subkey(key, rotation)
+        f = DES.permutation(DES.substitution(DES.key_mixing(subkey, DES.expansion(right))))
+        left, right = right, left ^ f
+    return permute((right << 32) | left, IPINV_TABLES)
+
+def bench_blocks(nb_blocks, repeat):
+    """ Measure the cipher of blocks, step by step and with the SP tables
+
+        return case -> metric -> value
+    """
+    des = DES(os.urandom(8))
+    blocks = [int.from_bytes(os.urandom(8), 'big') for _ in range(nb_blocks)]
+    step_time = best_time(lambda: [step_by_step_encrypt(des, b) for b in blocks], repeat)
+    sp_time = best_time(lambda: [des.encrypt_block(b) for b in blocks], repeat)
+    return {
+        'des/step-by-step': {'blocks_per_s': nb_blocks / step_time},
+        'des/sp-tables': {'blocks_per_s': nb_blocks / sp_time},
+    }
+
+def bench_triple_des(nb_blocks, repeat):
+    """ Measure Triple DES, fused and as 3 DES one after the other
+
+        return case -> metric -> value
+    """
+    tdes = TripleDES(os.urandom(24))
+    des1, des2, des3 = tdes.stages
+    blocks = [int.from_bytes(os.urandom(8), 'big') for _ in range(nb_blocks)]
+    separate_time = best_time(lambda: [des3.encrypt_block(des2.decrypt_block(
+        des1.encrypt_block(b))) for b in blocks], repeat)
+    fused_time = best_time(lambda: [tdes.encrypt_block(b) for b in blocks], repeat)
+    return {
+        '3des/separate': {'blocks_per_s': nb_blocks / separate_time},
+        '3des/fused': {'blocks_per_s': nb_blocks / fused_time},
+    }
+
+def bench_bitslice(nb_blocks, repeat):
+    """ Measure the bitsliced engine, ECB and CTR, for some widths
+
+        return case -> metric -> value
+    """
+    des = DES(os.urandom(8))
+    data = os.urandom(nb_blocks * DES.BLOCK_SIZE)
+    results = {}
+    for width in BITSLICE_WIDTHS:
+        bitslice = DESBitslice(des, width)
+        ecb_time = best_time(lambda: bitslice.cipher(data), repeat)
+        ctr_time = best_time(lambda: bitslice.cipher_ctr(data, 0), repeat)
+        results['des-bitslice-%d/ECB' % width] = {'blocks_per_s': nb_blocks / ecb_time}
+        results['des-bitslice-%d/CTR' % width] = {'blocks_per_s': nb_blocks / ctr_time}
+    return results
+
+def run(nb_blocks, repeat):
+    """ Run all the cases
+
+        return case -> metric -> value
+    """
+    key = os.urandom(8)
+    results = {'des/key_schedule': {'generate_s': best_time(lambda: DES(key), repeat)}}
+    print("%-28s %.3g s" % ('des/key_schedule', results['des/key_schedule']['generate_s']))
+    cases = bench_blocks(nb_blocks, repeat)
+    cases.update(bench_triple_des(nb_blocks, repeat))
+    cases.update(bench_bitslice(max(nb_blocks, max(BITSLICE_WIDTHS)), repeat))
+    for case, metrics in cases.items():
+        results[case] = metrics
+        print("%-28s %10.0f blocks/s" % (case, metrics['blocks_per_s']))
+    return results
+
+def main():
+    parser = argparse.ArgumentParser(description="DES benchmark")
+    parser.add_argument("--blocks", type=int, default=1000,
+                        help="number of blocks ciphered in a measure (default: 1000)")
+    parser.add_argument("--repeat", type=int, default=3,
+                        help="number of measures of each case, the best is kept")
+    add_arguments(parser)
+    args = parser.parse_args()
+    report("des", run(args.blocks, args.repeat), args)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,77 @@
+#!/usr/bin/env python3
+
+""" SHA1 benchmark
+
+    Measure the number of messages hashed per second for many small records,
+    with a loop of the scalar SHA1 and with SHA1Batch (if NumPy is installed),
+    and the throughput (bytes/s) of the scalar SHA1 on a large message.
+    Compare the results with a JSON baseline, and exit with an error if a case
+    regressed more than the threshold.
+
+    Usage (from the root of the project):
+        python3 -m benchmarks.bench_sha1 --save        # write the baseline
+        python3 -m benchmarks.bench_sha1               # check against it
+        python3 -m benchmarks.bench_sha1 --messages 10000 --record-size 100
+"""
+
+import os
+import argparse
+from src.SHA1 import SHA1
+from src.SHA1Batch import SHA1Batch
+from benchmarks._bench import (best_time, report, add_arguments, parse_size)
+
+def bench_messages(nb_messages, record_size, repeat):
+    """ Measure the hash of many small messages, one by one and in batch
+
+        return case -> metric -> value
+    """
+    messages = [os.urandom(record_size) for _ in range(nb_messages)]
+    results = {}
+    scalar_time = best_time(lambda: [SHA1().hash(m) for m in messages], repeat)
+    results['scalar'] = {'messages_per_s': nb_messages / scalar_time}
+    if SHA1Batch.available():
+        batch_time = best_time(lambda: SHA1Batch().hash(messages), repeat)
+        results['batch'] = {'messages_per_s': nb_messages / batch_time}
+    return results
+
+def bench_stream(size, repeat):
+    """ Measure the hash of a large message
+
+        return a dict of metrics
+    """
+    data = os.urandom(size)
+    hash_time = best_time(lambda: SHA1(data).digest(), repeat)
+    return {'bytes_per_s': size / hash_time, 'block_latency_s': hash_time / (size // 64)}
+
+def run(nb_messages, record_size, size, repeat):
+    """ Run all the cases
+
+        return case -> metric -> value
+    """
+    results = {}
+    for engine, metrics in bench_messages(nb_messages, record_size, repeat).items():
+        case = "sha1-%s/%dx%d" % (engine, nb_messages, record_size)
+        results[case] = metrics
+        print("%-28s %10.0f messages/s" % (case, metrics['messages_per_s']))
+    case = "sha1-stream/%d" % size
+    results[case] = bench_stream(size, repeat)
+    print("%-28s %10.0f B/s  %.3g s/block"
+          % (case, results[case]['bytes_per_s'], results[case]['block_latency_s']))
+    return results
+
+def main():
+    parser = argparse.ArgumentParser(description="SHA1 benchmark")
+    parser.add_argument("--messages", type=int, default=1000,
+                        help="number of small messages (default: 1000)")
+    parser.add_argument("--record-size", type=int, default=100,
+                        help="size of a small message, in bytes (default: 100)")
+    parser.add_argument("--size", default="1M",
+                        help="size of the large message (default: 1M)")
+    parser.add_argument("--repeat", type=int, default=3,
+                        help="number of measures of each case, the best is kept")
+    add_arguments(parser)
+    args = parser.parse_args()
+    report("sha1", run(args.messages, args.record_size, parse_size(args.size), args.repeat), args)
+
+if __name__ == '__main__':
+    main()
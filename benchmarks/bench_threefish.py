@@ -0,0 +1,93 @@
+#!/usr/bin/env python3
+
+""" Threefish throughput benchmark
+
+    Measure cipher/decipher throughput (bytes/s) and latency per block for
+    each block size, mode (ECB, CBC) and input size, and the cost of the key
+    schedule. Compare the results with a JSON baseline, and exit with an error
+    if a case regressed more than the threshold.
+
+    Usage (from the root of the project):
+        python3 -m benchmarks.bench_threefish --save        # write the baseline
+        python3 -m benchmarks.bench_threefish               # check against it
+        python3 -m benchmarks.bench_threefish --max-size 64M
+"""
+
+import os
+import argparse
+from src.Threefish import Threefish
+from benchmarks._bench import (best_time, report, add_arguments, parse_size)
+
+BLOCK_SIZES = (32, 64, 128)
+MODES = ('ECB', 'CBC')
+INPUT_SIZES = (64, 4096, 65536, 1 << 20, 16 << 20, 64 << 20)
+
+def bench_key_schedule(block_size, repeat):
+    """ Measure the key schedule, without and with the schedule cache
+
+        return a dict of metrics
+    """
+    u_key = os.urandom(block_size + 16)
+    threefish = Threefish(block_size, u_key)
+    generate = lambda: Threefish.generate_rounds_keys(block_size, threefish.key,
+                                                     threefish.tweaks)
+    return {
+        'generate_s': best_time(generate, repeat),
+        'cached_s': best_time(threefish.key_schedule, repeat),
+    }
+
+def bench_cipher(block_size, mode, size, repeat):
+    """ Measure the cipher and decipher of a random input
+
+        return a dict of metrics
+    """
+    threefish = Threefish(block_size, os.urandom(block_size + 16))
+    threefish.key_schedule()
+    IV = os.urandom(block_size) if mode == 'CBC' else None
+    plaintext = os.urandom(size)
+    ciphertext = threefish.cipher(plaintext, IV)
+    nb_blocks = len(ciphertext) // block_size
+
+    cipher_time = best_time(lambda: threefish.cipher(plaintext, IV), repeat)
+    decipher_time = best_time(lambda: threefish.decipher(ciphertext, IV), repeat)
+    return {
+        'cipher_bytes_per_s': size / cipher_time,
+        'decipher_bytes_per_s': size / decipher_time,
+        'cipher_block_latency_s': cipher_time / nb_blocks,
+        'decipher_block_latency_s': decipher_time / nb_blocks,
+    }
+
+def run(max_size, repeat):
+    """ Run all the cases
+
+        return case -> metric -> value
+    """
+    results = {}
+    for block_size in BLOCK_SIZES:
+        case = "key_schedule/%d" % (block_size * 8)
+        results[case] = bench_key_schedule(block_size, repeat)
+        print("%-28s %s" % (case, ', '.join("%s=%.3g" % m for m in sorted(results[case].items()))))
+        for mode in MODES:
+            for size in INPUT_SIZES:
+                if size > max_size:
+                    continue
+                case = "threefish-%d/%s/%d" % (block_size * 8, mode, size)
+                results[case] = bench_cipher(block_size, mode, size, repeat)
+                print("%-28s cipher %10.0f B/s  decipher %10.0f B/s  %.3g s/block"
+                      % (case, results[case]['cipher_bytes_per_s'],
+                         results[case]['decipher_bytes_per_s'],
+                         results[case]['cipher_block_latency_s']))
+    return results
+
+def main():
+    parser = argparse.ArgumentParser(description="Threefish throughput benchmark")
+    parser.add_argument("--max-size", default="1M",
+                        help="largest input size, up to 64M (default: 1M)")
+    parser.add_argument("--repeat", type=int, default=3,
+                        help="number of measures of each case, the best is kept")
+    add_arguments(parser)
+    args = parser.parse_args()
+    report("threefish", run(parse_size(args.max_size), args.repeat), args)
+
+if __name__ == '__main__':
+    main()
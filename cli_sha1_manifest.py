@@ -0,0 +1,43 @@
+import os
+import sys
+import argparse
+from src.SHA1Manifest import SHA1Manifest
+
+parser = argparse.ArgumentParser(description="Build or verify the SHA-1 manifest of a directory")
+parser.add_argument("command", choices=("build", "verify"))
+parser.add_argument("directory", help="the directory tree to hash")
+parser.add_argument("--manifest", default=None,
+                    help="path of the manifest (default: outputs/<directory>.manifest.json)")
+parser.add_argument("--workers", type=int, default=None,
+                    help="number of processes (default: the number of cores)")
+parser.add_argument("--full", action="store_true",
+                    help="verify: hash all the files, even if their size and mtime didn't change")
+parser.add_argument("--update", action="store_true",
+                    help="verify: write the changes in the manifest")
+args = parser.parse_args()
+
+path = args.manifest or os.path.join(
+    "outputs", os.path.basename(os.path.abspath(args.directory)) + ".manifest.json")
+
+if args.command == "build":
+    manifest = SHA1Manifest(args.directory)
+    manifest.build(args.workers)
+    manifest.save(path)
+    print("MANIFEST: " + path)
+else:
+    manifest = SHA1Manifest.load(path, args.directory)
+    result = manifest.verify(args.workers, full=args.full, update=args.update)
+    for status in ('modified', 'missing', 'new'):
+        for name in result[status]:
+            print("%-9s %s" % (status.upper(), name))
+    print("%d files ok, %d modified, %d missing, %d new"
+          % tuple(len(result[status]) for status in ('ok', 'modified', 'missing', 'new')))
+    if args.update:
+        manifest.save(path)
+
+print("%d files hashed (%d bytes) in %.2f s: %.2f MB/s, %.1f files/s (SHA-1 backend: %s)"
+      % (manifest.stats['files'], manifest.stats['bytes'], manifest.stats['seconds'],
+         manifest.stats['mb_per_s'], manifest.stats['files_per_s'], manifest.stats['backend']))
+
+if args.command == "verify" and (result['modified'] or result['missing']):
+    sys.exit(1)
@@ -1,3 +1,5 @@
+import os
+import sys
 from src.Threefish import Threefish
 from src._functions import generate_random_unicode_string
 
@@ -10,6 +12,25 @@ threefish = Threefish(block_size, key)
 # Generate the rounds keys
 threefish.key_schedule()
 
+# If you want to cipher a file of the 'assets' directory instead of the text,
+# set FILE to its name. The files are memory-mapped, so they can be larger than
+# the memory. The outputs are written in the 'outputs' directory.
+FILE = None
+# FILE = "lena.pgm"
+
+if FILE:
+    print("FILE TO CIPHER: " + FILE + "\n")
+    input_path = os.path.join("assets", FILE)
+    ciphered_path = os.path.join("outputs", FILE + ".cipher")
+    deciphered_path = os.path.join("outputs", FILE)
+    # cipher in ECB mode, with all the cores
+    threefish.cipher_file_mmap(input_path, ciphered_path, workers=None)
+    print("CIPHERTEXT: " + ciphered_path + "\n")
+    # decipher
+    threefish.decipher_file_mmap(ciphered_path, deciphered_path, workers=None)
+    print("DECIPHERED FILE: " + deciphered_path + "\n")
+    sys.exit()
+
 # TEXT TO CIPHER
 plaintext = "Lorem ipsum dolor sit amet, consectetur adipisicing elit, sed do eiusmod \
 tempor incididunt ut labore et dolore magna aliqua. Ut enim ad minim veniam, quis \
@@ -0,0 +1,216 @@
+#!/usr/bin/env python3
+
+""" This module contains the CipherCache class
+"""
+
+import os
+import re
+import json
+import threading
+from src import _backends
+
+class CipherCache(object):
+    """ On disk cache of the outputs of deterministic ciphers
+
+        An output is stored in a file named by the SHA1 of the algorithm, its
+        parameters, a fingerprint of the key (the SHA1 of the key, the key itself
+        is never stored) and the SHA1 of the input. When the same input is
+        ciphered again with the same key and parameters, the output is read
+        from the file and the cipher isn't run.
+
+        It must only be used with deterministic ciphers (CTR with a fixed
+        nonce, RC4, A5/1, Caesar, Affine, ..), the cache doesn't check it: the
+        modes with a random padding (the ECB and CBC of Threefish and DES) are
+        not deterministic.
+
+        The total size of the files is bounded: the least recently used outputs
+        are removed (the modification time of a file is its last use).
+
+        The directory can contain other files: only the files named like an
+        output of the cache (the SHA1 and ENTRY_SUFFIX) are listed, evicted and
+        removed, so the cache can't remove the files of the user.
+
+        Attributes:
+            directory -- string -- where the outputs are stored
+            max_size -- int -- the maximum size of the cache, in bytes
+            hits -- int -- the number of outputs read from the cache
+            misses -- int -- the number of outputs computed
+            evictions -- int -- the number of outputs removed from the cache
+            _entries -- dict -- name -> size, from the least to the most recently used
+    """
+
+    # the extension of the outputs
+    ENTRY_SUFFIX = ".ciphercache"
+    # files being written, not in the cache yet: the output file name,
+    # the id of the thread, and this suffix
+    TEMPORARY_SUFFIX = ".tmp"
+    ENTRY_PATTERN = re.compile(r"^([0-9a-f]{40})" + re.escape(ENTRY_SUFFIX) + "$")
+    TEMPORARY_PATTERN = re.compile(r"^[0-9a-f]{40}" + re.escape(ENTRY_SUFFIX)
+                                   + r"\.[0-9]+" + re.escape(TEMPORARY_SUFFIX) + "$")
+
+    def __init__(self, directory=os.path.join("outputs", "cache"), max_size=256 << 20):
+        """
+            Args:
+                directory -- string -- where the outputs are stored
+                max_size -- int -- the maximum size of the cache, in bytes
+        """
+        self.directory = directory
+        self.max_size = max_size
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._lock = threading.Lock()
+        os.makedirs(directory, exist_ok=True)
+        files = []
+        for file_name in os.listdir(directory):
+            path = os.path.join(directory, file_name)
+            entry = self.ENTRY_PATTERN.match(file_name)
+            if self.TEMPORARY_PATTERN.match(file_name):
+                # left by an interrupted put
+                os.remove(path)
+            elif entry and os.path.isfile(path):
+                info = os.stat(path)
+                files.append((info.st_mtime_ns, entry.group(1), info.st_size))
+        self._entries = {name: size for _, name, size in sorted(files)}
+        self._evict()
+
+    def _path(self, name):
+        """ return the path of the file of an output
+        """
+        return os.path.join(self.directory, name + self.ENTRY_SUFFIX)
+
+    @staticmethod
+    def _to_bytes(data):
+        """ return the data as bytes, with a first byte telling if it was a string
+        """
+        if isinstance(data, str):
+            return b'S' + data.encode('utf-8', 'surrogatepass')
+        return b'B' + bytes(data)
+
+    @staticmethod
+    def _from_bytes(data):
+        """ Invert _to_bytes
+        """
+        if data[:1] == b'S':
+            return data[1:].decode('utf-8', 'surrogatepass')
+        return data[1:]
+
+    @staticmethod
+    def entry_key(algorithm, parameters, key, data):
+        """ Compute the name of the output in the cache
+
+            Args:
+                algorithm -- string -- the name of the cipher and its mode
+                parameters -- dict -- the other parameters (block size, IV, nonce, ..),
+                    must be serialisable in JSON (bytes are written in hexadecimal)
+                key -- bytes, string or int -- the key
+                data -- bytes or string -- the input
+
+            return the hexadecimal SHA1
+        """
+        new_sha1 = _backends.get('sha1')
+        fingerprint = new_sha1(CipherCache._to_bytes(str(key) if isinstance(key, int) else key))
+        description = json.dumps([algorithm, parameters, fingerprint.hexdigest(),
+                                  new_sha1(CipherCache._to_bytes(data)).hexdigest()],
+                                 sort_keys=True,
+                                 default=lambda value: bytes(value).hex())
+        return new_sha1(description.encode('utf-8')).hexdigest()
+
+    def get(self, name):
+        """ Read an output of the cache
+
+            Args:
+                name -- string -- the name of the output, made by entry_key
+
+            return the output, or None if it isn't in the cache
+        """
+        path = self._path(name)
+        with self._lock:
+            if name not in self._entries:
+                self.misses += 1
+                return None
+            try:
+                with open(path, "rb") as f:
+                    data = f.read()
+            except FileNotFoundError:
+                del self._entries[name]
+                self.misses += 1
+                return None
+            os.utime(path)
+            # move it to the end of the order of the use
+            self._entries[name] = self._entries.pop(name)
+            self.hits += 1
+        return self._from_bytes(data)
+
+    def put(self, name, output):
+        """ Write an output in the cache, and remove the oldest ones if needed
+
+            Args:
+                name -- string -- the name of the output, made by entry_key
+                output -- bytes or string -- the output to store
+        """
+        data = self._to_bytes(output)
+        if len(data) > self.max_size:
+            return
+        path = self._path(name)
+        temporary = path + "." + str(threading.get_ident()) + self.TEMPORARY_SUFFIX
+        with open(temporary, "wb") as f:
+            f.write(data)
+        os.replace(temporary, path)
+        with self._lock:
+            self._entries.pop(name, None)
+            self._entries[name] = len(data)
+            self._evict()
+
+    def _evict(self):
+        """ Remove the least recently used outputs until the cache fits in max_size
+        """
+        total = sum(self._entries.values())
+        for name in list(self._entries):
+            if total <= self.max_size:
+                break
+            total -= self._entries.pop(name)
+            try:
+                os.remove(self._path(name))
+            except FileNotFoundError:
+                pass
+            self.evictions += 1
+
+    def cached(self, algorithm, parameters, key, data, compute):
+        """ Return the output from the cache, or compute and store it
+
+            Args:
+                algorithm -- string -- the name of the cipher and its mode
+                parameters -- dict -- the other parameters (block size, IV, nonce, ..)
+                key -- bytes, string or int -- the key
+                data -- bytes or string -- the input
+                compute -- function -- called with data if the output isn't in the cache
+
+            return the output
+        """
+        name = self.entry_key(algorithm, parameters, key, data)
+        output = self.get(name)
+        if output is None:
+            output = compute(data)
+            self.put(name, output)
+        return output
+
+    def info(self):
+        """ return the statistics of the cache
+        """
+        with self._lock:
+            return {'hits': self.hits, 'misses': self.misses, 'evictions': self.evictions,
+                    'entries': len(self._entries),
+                    'size': sum(self._entries.values()),
+                    'max_size': self.max_size}
+
+    def clear(self):
+        """ Remove all the outputs of the cache
+        """
+        with self._lock:
+            for name in self._entries:
+                try:
+                    os.remove(self._path(name))
+                except FileNotFoundError:
+                    pass
+            self._entries = {}
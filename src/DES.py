@@ -1,10 +1,14 @@
 #!/usr/bin/env python3
 
 """ This module contains The DES class and all the DES's tables
+
+    In the tables, the bits are numbered from the most significant one (0)
+    to the least significant one, like in the DES standard (FIPS 46-3).
 """
 
-import src._utils as utils
-from src.Feistel import Feistel
+import struct
+from src._utils import (add_padding, cut_blocks, run_file)
+from src.Feistel import FeistelNetwork
 
 # initial permutation table
 IP = (57, 49, 41, 33, 25, 17, 9, 1, 59, 51, 43, 35, 27, 19, 11, 3, 61, 53, 45,
@@ -24,14 +28,17 @@ IPINV = (39, 7, 47, 15, 55, 23, 63, 31, 38, 6, 46, 14, 54, 22, 62, 30, 37, 5,
          51, 19, 59, 27, 34, 2, 42, 10, 50, 18, 58, 26, 33, 1, 41, 9, 49, 17,
          57, 25, 32, 0, 40, 8, 48, 16, 56, 24)
 # permuted choice 1
-PC1 = (57, 49, 41, 33, 25, 17, 9, 1, 58, 50, 42, 34, 26, 18, 10, 2, 59, 51, 43,
-       35, 27, 19, 11, 3, 60, 52, 44, 36, 63, 55, 47, 39, 31, 23, 15, 7, 62, 54,
-       46, 38, 30, 22, 14, 6, 61, 53, 45, 37, 29, 21, 13, 5, 28, 20, 12, 4)
+PC1 = (56, 48, 40, 32, 24, 16, 8, 0, 57, 49, 41, 33, 25, 17, 9, 1, 58, 50, 42,
+       34, 26, 18, 10, 2, 59, 51, 43, 35, 62, 54, 46, 38, 30, 22, 14, 6, 61,
+       53, 45, 37, 29, 21, 13, 5, 60, 52, 44, 36, 28, 20, 12, 4, 27, 19, 11, 3)
 # Permuted choice 2
 PC2 = (13, 16, 10, 23, 0, 4, 2, 27, 14, 5, 20, 9, 22, 18, 11, 3, 25, 7, 15, 6,
        26, 19, 12, 1, 40, 51, 30, 36, 46, 54, 29, 39, 50, 44, 32, 47, 43, 48,
        38, 55, 33, 52, 45, 41, 49, 35, 28, 31)
 
+# number of left rotations of the 2 halves of the key, at each round
+ROTATIONS = (1, 1, 2, 2, 2, 2, 2, 2, 1, 2, 2, 2, 2, 2, 2, 1)
+
 SBOX = 8*[64*[0]]
 
 SBOX[0] = (14, 4, 13, 1, 2, 15, 11, 8, 3, 10, 6, 12, 5, 9, 0, 7, 0, 15, 7, 4,
@@ -74,42 +81,357 @@ SBOX[7] = (13, 2, 8, 4, 6, 15, 11, 1, 10, 9, 3, 14, 5, 0, 12, 7, 1, 15, 13, 8,
            6, 10, 13, 15, 3, 5, 8, 2, 1, 14, 7, 4, 10, 8, 13, 15, 12, 9, 0, 3,
            5, 6, 11)
 
-class DES(object):
-    """ DES implementation, using Festeil class
+def permutation_tables(table, in_bits):
+    """ Precompute a permutation for each byte of its input
+
+        The output of the permutation is the OR of the outputs of the bytes of
+        the input: one lookup per byte instead of one step per bit.
+
+        Args:
+            table -- tuple of int -- the position in the input of each output bit
+            in_bits -- int -- the size of the input, in bits (a multiple of 8)
+
+        return a tuple of (in_bits // 8) tables of 256 int
+    """
+    out_bits = len(table)
+    tables = []
+    for byte in range(in_bits // 8):
+        outputs = []
+        for value in range(256):
+            output = 0
+            for j, i in enumerate(table):
+                if i // 8 == byte and (value >> (7 - i % 8)) & 1:
+                    output |= 1 << (out_bits - 1 - j)
+            outputs.append(output)
+        tables.append(tuple(outputs))
+    return tuple(tables)
+
+def permute(value, tables):
+    """ Apply a permutation precomputed by permutation_tables
+
+        Args:
+            value -- int -- the input of the permutation
+            tables -- tuple -- the tables of the permutation
+
+        return the permuted value, as int
+    """
+    output = 0
+    shift = 8 * len(tables)
+    for table in tables:
+        shift -= 8
+        output |= table[(value >> shift) & 0xff]
+    return output
+
+IP_TABLES = permutation_tables(IP, 64)
+IPINV_TABLES = permutation_tables(IPINV, 64)
+E_TABLES = permutation_tables(E, 32)
+P_TABLES = permutation_tables(P, 32)
+PC1_TABLES = permutation_tables(PC1, 64)
+PC2_TABLES = permutation_tables(PC2, 56)
+
+def sp_tables():
+    """ Precompute the S-boxes followed by the permutation P
+
+        For each S-box, the 64 possible 6-bit inputs are mapped to their 4-bit
+        output, already moved by P to its place in the 32 bits output of F.
+        So F is the OR of 8 lookups.
+
+        return a tuple of 8 tables of 64 int
+    """
+    tables = []
+    for i in range(8):
+        outputs = []
+        for piece in range(64):
+            row = ((piece >> 4) & 0b10) | (piece & 1)
+            column = (piece >> 1) & 0xf
+            outputs.append(permute(SBOX[i][row*16 + column] << (28 - 4*i), P_TABLES))
+        tables.append(tuple(outputs))
+    return tuple(tables)
+
+SP = sp_tables()
+
+class DESModes(object):
+    """ The conversions of the blocks, the modes (ECB, CBC, CTR), the streams
+        and the files, shared by DES and TripleDES
+
+        The classes using it give the block functions: encrypt_block and
+        decrypt_block (one block), encrypt_blocks and decrypt_blocks (many
+        blocks, one after the other), encrypt_batch and decrypt_batch (many
+        blocks at once).
+    """
+
+    # size of a block, in bytes
+    BLOCK_SIZE = 8
+    MODES = ('ECB', 'CBC', 'CTR')
+    # size of the pieces read from a file
+    CHUNK_SIZE = 65536
+    # from this number of blocks, the modes which can process all the blocks
+    # at once (not the CBC cipher) use the bitsliced engine
+    BITSLICE_BLOCKS = 256
+
+    @staticmethod
+    def to_int(block):
+        """ Convert a block (or a key) to int
+
+            Args:
+                block -- int, bytes or string -- 64 bits, a string of '0'/'1'
+
+            return the block as a 64 bits int
+        """
+        if isinstance(block, int):
+            return block
+        if isinstance(block, str):
+            return int(block, 2)
+        return int.from_bytes(block, 'big')
+
+    @staticmethod
+    def from_int(value, like):
+        """ Convert a block to the type of another block
+
+            Args:
+                value -- int -- the 64 bits block
+                like -- int, bytes or string -- a block of the type to return
+
+            return the block, with the same type as like
+        """
+        if isinstance(like, int):
+            return value
+        if isinstance(like, str):
+            return format(value, '064b')
+        return value.to_bytes(8, 'big')
+
+    def cipher(self, plaintext):
+        """ Cipher the given block
+
+            Args:
+                plaintext -- int, bytes or string -- the 64 bits block to cipher
+
+            return the ciphertext, with the same type as the plaintext
+        """
+        return self.from_int(self.encrypt_block(self.to_int(plaintext)), plaintext)
+
+    def decipher(self, ciphertext):
+        """ Decipher the given block
+
+            Args:
+                ciphertext -- int, bytes or string -- the 64 bits block to decipher
+
+            return the plaintext, with the same type as the ciphertext
+        """
+        return self.from_int(self.decrypt_block(self.to_int(ciphertext)), ciphertext)
+
+    def cipher_words(self, blocks, mode='ECB', previous=None):
+        """ Cipher blocks in ECB, CBC or CTR mode
+
+            Args:
+                blocks -- sequence of int -- the 64 bits blocks
+                mode -- string -- 'ECB', 'CBC' or 'CTR'
+                previous -- int -- in CBC mode, the IV or the last ciphered block,
+                    in CTR mode, the counter of the first block
+
+            return the list of ciphered blocks, and the next previous value
+        """
+        encrypt = self.encrypt_block
+        batch = len(blocks) >= self.BITSLICE_BLOCKS
+        if mode == 'ECB':
+            if batch:
+                return self.encrypt_batch(blocks), None
+            return self.encrypt_blocks(blocks), None
+        if mode == 'CBC':
+            ciphered = []
+            for block in blocks:
+                previous = encrypt(block ^ previous)
+                ciphered.append(previous)
+            return ciphered, previous
+        next_counter = (previous + len(blocks)) & 0xffffffffffffffff
+        counters = [(previous + i) & 0xffffffffffffffff for i in range(len(blocks))]
+        keystream = self.encrypt_batch(counters) if batch else map(encrypt, counters)
+        return [block ^ key for block, key in zip(blocks, keystream)], next_counter
+
+    def decipher_words(self, blocks, mode='ECB', previous=None):
+        """ Decipher blocks in ECB, CBC or CTR mode
+
+            Args:
+                blocks -- sequence of int -- the 64 bits blocks
+                mode -- string -- 'ECB', 'CBC' or 'CTR'
+                previous -- int -- in CBC mode, the IV or the last ciphered block,
+                    in CTR mode, the counter of the first block
+
+            return the list of deciphered blocks, and the next previous value
+        """
+        if mode == 'CTR':
+            return self.cipher_words(blocks, mode, previous)
+        if len(blocks) >= self.BITSLICE_BLOCKS:
+            deciphered = self.decrypt_batch(blocks)
+        else:
+            deciphered = self.decrypt_blocks(blocks)
+        if mode == 'ECB':
+            return deciphered, None
+        # each block is xored with the ciphered block which precedes it
+        deciphered = [block ^ before
+                      for block, before in zip(deciphered, (previous,) + tuple(blocks[:-1]))]
+        return deciphered, blocks[-1] if blocks else previous
+
+    def encryptor(self, mode='ECB', IV=None):
+        """ Create an object to cipher a stream, chunk by chunk
+
+            Args:
+                mode -- string -- 'ECB', 'CBC' or 'CTR'
+                IV -- bytes or int -- the initialization vector (CBC) or the
+                    first counter block (CTR)
+
+            return a DESEncryptor
+        """
+        return DESEncryptor(self, mode, IV)
+
+    def decryptor(self, mode='ECB', IV=None):
+        """ Create an object to decipher a stream, chunk by chunk
+
+            Args:
+                mode -- string -- 'ECB', 'CBC' or 'CTR'
+                IV -- bytes or int -- the initialization vector (CBC) or the
+                    first counter block (CTR)
+
+            return a DESDecryptor
+        """
+        return DESDecryptor(self, mode, IV)
+
+    def cipher_bytes(self, plaintext, mode='ECB', IV=None):
+        """ Cipher bytes of any length
+
+            In ECB and CBC modes, the plaintext is padded (ISO 10126), in CTR
+            mode the ciphertext has the length of the plaintext.
+
+            Args:
+                plaintext -- bytes -- the data to cipher
+                mode -- string -- 'ECB', 'CBC' or 'CTR'
+                IV -- bytes or int -- the initialization vector (CBC) or the
+                    first counter block (CTR)
+
+            return the ciphertext, as bytes
+        """
+        encryptor = self.encryptor(mode, IV)
+        return b''.join((encryptor.update(plaintext), encryptor.finalize()))
+
+    def decipher_bytes(self, ciphertext, mode='ECB', IV=None):
+        """ Decipher bytes ciphered by cipher_bytes
+
+            Args:
+                ciphertext -- bytes -- the data to decipher
+                mode -- string -- 'ECB', 'CBC' or 'CTR'
+                IV -- bytes or int -- the initialization vector (CBC) or the
+                    first counter block (CTR)
+
+            return the plaintext, as bytes
+        """
+        decryptor = self.decryptor(mode, IV)
+        return b''.join((decryptor.update(ciphertext), decryptor.finalize()))
+
+    def cipher_file(self, f_in, f_out, mode='ECB', IV=None):
+        """ Cipher a file chunk by chunk, the memory used doesn't depend
+            on the size of the file
+
+            Args:
+                f_in -- file object -- the file to cipher, opened in 'rb' mode
+                f_out -- file object -- where to write the ciphertext, opened in 'wb' mode
+                mode -- string -- 'ECB', 'CBC' or 'CTR'
+                IV -- bytes or int -- the initialization vector or the first counter block
+        """
+        run_file(self.encryptor(mode, IV), f_in, f_out, self.CHUNK_SIZE)
+
+    def decipher_file(self, f_in, f_out, mode='ECB', IV=None):
+        """ Decipher a file chunk by chunk, the memory used doesn't depend
+            on the size of the file
+
+            Args:
+                f_in -- file object -- the file to decipher, opened in 'rb' mode
+                f_out -- file object -- where to write the plaintext, opened in 'wb' mode
+                mode -- string -- 'ECB', 'CBC' or 'CTR'
+                IV -- bytes or int -- the initialization vector or the first counter block
+        """
+        run_file(self.decryptor(mode, IV), f_in, f_out, self.CHUNK_SIZE)
+
+class DES(DESModes):
+    """ DES implementation, on 64 bits integers
+
+        The blocks and the key can be given as int, as 8 bytes, or as strings
+        of 64 '0'/'1': the ciphertext has the same type as the plaintext.
 
         Attributes:
             rounds -- int -- number of festeil rounds
-            key -- string -- original key: string representing 64 bits (length 64)
-            permuted_key -- string -- original key after permutation PC1 (length 56)
+            key -- int -- original key (64 bits)
+            permuted_key -- int -- original key after permutation PC1 (56 bits)
+            subkeys -- tuple of int -- the 16 subkeys (48 bits), generated once
+            subkeys_pieces -- tuple -- each subkey cut in 8 pieces of 6 bits
+            inverse_pieces -- tuple -- the same pieces, in the reverse order (to decipher)
+            network -- DESNetwork -- the Feistel network of the rounds, with the subkeys
+            _bitslice -- DESBitslice -- the bitsliced engine, created when needed
     """
 
     def __init__(self, key):
+        """
+            Args:
+                key -- int, bytes or string -- the 64 bits key
+        """
         self.rounds = 16
         # original key
-        self.key = key
+        self.key = self.to_int(key)
         # 64-bits key to 56-bits permuted key
-        self.permuted_key = ''.join([self.key[i] for i in PC1])
+        self.permuted_key = permute(self.key, PC1_TABLES)
+        self.subkeys = self.generate_subkeys(self.permuted_key)
+        self.subkeys_pieces = tuple(self.cut_subkey(subkey) for subkey in self.subkeys)
+        self.network = DESNetwork(self.subkeys_pieces)
+        self.inverse_pieces = self.network.inverse_subkeys
+        self._bitslice = None
 
     @staticmethod
-    def generate_next_subkey(key):
+    def generate_next_subkey(key, rotation=1):
         """ From the given key, generate the new key (left rotation)
             and the next subkey using the key
 
             Args:
-                key -- string -- 56 bits string
+                key -- int -- 56 bits key
+                rotation -- int -- the number of rotations of each half
 
             return the new key and next subkey
         """
         # split the 56-bits key in 2 blocks
-        k_left = key[:28]
-        k_right = key[28:]
-        # rotate by one to the left each block
-        k_left = k_left[1:] + k_left[0]
-        k_right = k_right[1:] + k_right[0]
+        k_left = key >> 28
+        k_right = key & 0xfffffff
+        # rotate to the left each block
+        k_left = ((k_left << rotation) | (k_left >> (28 - rotation))) & 0xfffffff
+        k_right = ((k_right << rotation) | (k_right >> (28 - rotation))) & 0xfffffff
         # generate the next subkey
-        new_k = k_left + k_right
+        new_k = (k_left << 28) | k_right
         # return new key and the subkey generated
-        return new_k, ''.join([new_k[i] for i in PC2])
+        return new_k, permute(new_k, PC2_TABLES)
+
+    @staticmethod
+    def generate_subkeys(permuted_key):
+        """ Generate the 16 subkeys
+
+            Args:
+                permuted_key -- int -- the key after the permutation PC1 (56 bits)
+
+            return a tuple of 16 int (48 bits)
+        """
+        subkeys = []
+        key = permuted_key
+        for rotation in ROTATIONS:
+            key, subkey = DES.generate_next_subkey(key, rotation)
+            subkeys.append(subkey)
+        return tuple(subkeys)
+
+    @staticmethod
+    def cut_subkey(subkey):
+        """ Cut a subkey in the 8 pieces of 6 bits xored with the inputs of the S-boxes
+
+            Args:
+                subkey -- int -- 48 bits subkey
+
+            return a tuple of 8 int
+        """
+        return tuple((subkey >> (42 - 6*i)) & 0x3f for i in range(8))
 
     @staticmethod
     def expansion(block):
@@ -118,11 +440,11 @@ class DES(object):
             permutation
 
             Args:
-                block -- string -- 32 bits string
+                block -- int -- 32 bits block
 
-            return the 48 bits string
+            return the 48 bits block
         """
-        return ''.join([block[i] for i in E])
+        return permute(block, E_TABLES)
 
     @staticmethod
     def key_mixing(key, expended_block):
@@ -130,12 +452,12 @@ class DES(object):
             combine the key with expended block using xor operator
 
             Args:
-                key -- string -- 48 bits key
-                expended_block -- string -- 48 bits block
+                key -- int -- 48 bits key
+                expended_block -- int -- 48 bits block
 
             return the result of xor operation between the 2 args
         """
-        return utils.binary_xor(key, expended_block)
+        return key ^ expended_block
 
     @staticmethod
     def substitution(block):
@@ -145,16 +467,18 @@ class DES(object):
             [8 blocks of 6 bits --> 8 blocks of 4 bits]
 
             Args:
-                block -- string -- 48 bits block
+                block -- int -- 48 bits block
 
             return the block reduced to 32 bits
         """
-        ouputs = []
+        output = 0
         for i in range(8):
-            row = int(block[0] + block[5], 2)
-            column = int(block[1] + block[2] + block[3] + block[4], 2)
-            ouputs.append(SBOX[i][row*16 + column])
-        return ''.join([utils.decimal_to_binary(ouput, 4) for ouput in ouputs])
+            piece = (block >> (42 - 6*i)) & 0x3f
+            # the row is given by the first and last bits, the column by the 4 others
+            row = ((piece >> 4) & 0b10) | (piece & 1)
+            column = (piece >> 1) & 0xf
+            output = (output << 4) | SBOX[i][row*16 + column]
+        return output
 
     @staticmethod
     def permutation(block):
@@ -163,43 +487,283 @@ class DES(object):
             fixed permutation,
 
             Args:
-                block -- string -- 32 bits string
+                block -- int -- 32 bits block
 
             return the permuted block
         """
-        return ''.join([block[i] for i in P])
+        return permute(block, P_TABLES)
 
     def F(self, key, block):
         """ Feistel function for DES
 
             Args:
-                key -- string -- a 48 bits key
-                block -- string -- a 32 bits block
+                key -- int -- a 48 bits key
+                block -- int -- a 32 bits block
 
             return the 32 bits ciphered block
         """
-        expended_block = self.expansion(block)
-        mixed_block = self.key_mixing(key, expended_block)
-        substituted = self.substitution(mixed_block)
-        permuted = self.permutation(substituted)
+        # the expansion, the S-boxes and P are done by the lookups in the SP tables
+        k0, k1, k2, k3, k4, k5, k6, k7 = self.cut_subkey(key)
+        return self.sp_function(block, k0, k1, k2, k3, k4, k5, k6, k7)
 
-        return ''.join([str(b) for b in permuted])
+    @staticmethod
+    def round_function(subkey_pieces, block):
+        """ Feistel function for DES, with a subkey already cut by cut_subkey
+            (the F function of the DES Feistel network)
 
-    def cipher(self, plaintext):
-        """ Run DES cipher on the given text
+            Args:
+                subkey_pieces -- tuple -- the 8 pieces of the subkey
+                block -- int -- a 32 bits block
+
+            return the 32 bits output of F
+        """
+        return DES.sp_function(block, *subkey_pieces)
+
+    @staticmethod
+    def sp_function(block, k0, k1, k2, k3, k4, k5, k6, k7):
+        """ F with the subkey already cut in pieces, and the SP tables
+
+            The block is rotated to the right by 1 bit: then the 6 bits input of
+            each S-box (given by E) are consecutive bits of the rotated block.
+
+            Args:
+                block -- int -- a 32 bits block
+                k0, .., k7 -- int -- the pieces of the subkey (6 bits each)
+
+            return the 32 bits output of F
+        """
+        r = ((block >> 1) | (block << 31)) & 0xffffffff
+        return (SP[0][(r >> 26) ^ k0] | SP[1][((r >> 22) & 0x3f) ^ k1]
+                | SP[2][((r >> 18) & 0x3f) ^ k2] | SP[3][((r >> 14) & 0x3f) ^ k3]
+                | SP[4][((r >> 10) & 0x3f) ^ k4] | SP[5][((r >> 6) & 0x3f) ^ k5]
+                | SP[6][((r >> 2) & 0x3f) ^ k6] | SP[7][((r << 2) | (r >> 30)) & 0x3f ^ k7])
+
+    def encrypt_block(self, block):
+        """ Cipher a block with the precomputed subkeys
+
+            Args:
+                block -- int -- the 64 bits block
+
+            return the ciphered block, as int
+        """
+        return permute(self.network.encrypt(permute(block, IP_TABLES)), IPINV_TABLES)
+
+    def decrypt_block(self, block):
+        """ Decipher a block: the rounds with the subkeys in the reverse order
 
             Args:
-                plaintext -- string -- the text to cipher
+                block -- int -- the 64 bits block
+
+            return the deciphered block, as int
         """
-        # initial permutation
-        plaintext = [plaintext[i] for i in IP]
-        plaintext = ''.join([str(b) for b in plaintext])
+        return permute(self.network.decrypt(permute(block, IP_TABLES)), IPINV_TABLES)
+
+    def encrypt_blocks(self, blocks):
+        """ Cipher many blocks, one after the other, with the Feistel network
 
-        # run the 16 feistel rounds
-        feistel = Feistel(plaintext, self.permuted_key, self.F, self.generate_next_subkey)
-        ciphertext = feistel.run(self.rounds)
+            Args:
+                blocks -- sequence of int -- the 64 bits blocks
+
+            return the list of ciphered blocks
+        """
+        ciphered = self.network.encrypt_blocks([permute(block, IP_TABLES) for block in blocks])
+        return [permute(block, IPINV_TABLES) for block in ciphered]
 
-        # final permutation
-        ciphertext = [ciphertext[i] for i in IPINV]
+    def decrypt_blocks(self, blocks):
+        """ Decipher many blocks, one after the other, with the Feistel network
 
-        return ''.join(ciphertext)
+            Args:
+                blocks -- sequence of int -- the 64 bits blocks
+
+            return the list of deciphered blocks
+        """
+        deciphered = self.network.decrypt_blocks([permute(block, IP_TABLES) for block in blocks])
+        return [permute(block, IPINV_TABLES) for block in deciphered]
+
+    def bitslice(self):
+        """ return the bitsliced engine of the key, created at the first call
+        """
+        if self._bitslice is None:
+            # imported here: DESBitslice imports this module
+            from src.DESBitslice import DESBitslice
+            self._bitslice = DESBitslice(self)
+        return self._bitslice
+
+    def encrypt_batch(self, blocks):
+        """ Cipher many blocks at once with the bitsliced engine
+
+            Args:
+                blocks -- sequence of int -- the 64 bits blocks
+
+            return the list of ciphered blocks
+        """
+        return self.bitslice().encrypt_blocks(list(blocks))
+
+    def decrypt_batch(self, blocks):
+        """ Decipher many blocks at once with the bitsliced engine
+
+            Args:
+                blocks -- sequence of int -- the 64 bits blocks
+
+            return the list of deciphered blocks
+        """
+        return self.bitslice().decrypt_blocks(list(blocks))
+
+class DESEncryptor(object):
+    """ Cipher a stream with DES, chunk by chunk
+
+        The complete blocks are ciphered by update, the last incomplete block
+        is kept until the next call, and is padded (or, in CTR mode, xored with
+        a part of the keystream) by finalize.
+
+        Attributes:
+            des -- DES -- the instance used to cipher the blocks
+            mode -- string -- 'ECB', 'CBC' or 'CTR'
+            previous -- int -- the last ciphered block (CBC), the next counter (CTR)
+            buffer -- bytearray -- the bytes not ciphered yet (less than a block)
+            hold_back -- int -- the number of complete blocks kept by update
+    """
+
+    hold_back = 0
+
+    def __init__(self, des, mode='ECB', IV=None):
+        """
+            Args:
+                des -- DES -- the instance used to cipher the blocks
+                mode -- string -- 'ECB', 'CBC' or 'CTR'
+                IV -- bytes or int -- the initialization vector (CBC) or the
+                    first counter block (CTR)
+        """
+        if mode not in DES.MODES:
+            raise ValueError("unknown mode: " + str(mode))
+        if mode != 'ECB' and IV is None:
+            raise ValueError("the " + mode + " mode needs an IV")
+        self.des = des
+        self.mode = mode
+        self.previous = None if IV is None else DES.to_int(IV)
+        self.buffer = bytearray()
+
+    def process(self, blocks):
+        """ return the processed blocks, and the next previous value
+        """
+        return self.des.cipher_words(blocks, self.mode, self.previous)
+
+    def update(self, chunk):
+        """ Process the complete blocks available
+
+            Args:
+                chunk -- bytes -- the next part of the stream
+
+            return the processed bytes
+        """
+        pieces, self.buffer = cut_blocks(self.buffer, chunk, DES.BLOCK_SIZE, self.hold_back)
+        output = []
+        for piece in pieces:
+            nb_blocks = len(piece) // DES.BLOCK_SIZE
+            processed, self.previous = self.process(struct.unpack('>%dQ' % nb_blocks, piece))
+            output.append(struct.pack('>%dQ' % nb_blocks, *processed))
+        return output[0] if len(output) == 1 else b''.join(output)
+
+    def finalize(self):
+        """ Pad and cipher the last bytes (in CTR mode, cipher them without padding)
+
+            return the last ciphered bytes
+        """
+        if self.mode == 'CTR':
+            return self._finalize_ctr()
+        padded = add_padding(self.buffer, DES.BLOCK_SIZE * 8)
+        self.buffer = bytearray()
+        return self.update(padded)
+
+    def _finalize_ctr(self):
+        """ Xor the last incomplete block with the start of a keystream block
+
+            return the processed bytes
+        """
+        tail = bytes(self.buffer)
+        self.buffer = bytearray()
+        if not tail:
+            return b''
+        keystream = self.des.encrypt_block(self.previous).to_bytes(DES.BLOCK_SIZE, 'big')
+        return bytes(a ^ b for a, b in zip(tail, keystream))
+
+class DESDecryptor(DESEncryptor):
+    """ Decipher a stream with DES, chunk by chunk
+
+        In ECB and CBC modes, the last complete block is kept between 2 calls
+        to update, because it contains the padding, which is removed by finalize.
+    """
+
+    def __init__(self, des, mode='ECB', IV=None):
+        """
+            Args:
+                des -- DES -- the instance used to decipher the blocks
+                mode -- string -- 'ECB', 'CBC' or 'CTR'
+                IV -- bytes or int -- the initialization vector (CBC) or the
+                    first counter block (CTR)
+        """
+        DESEncryptor.__init__(self, des, mode, IV)
+        self.hold_back = 0 if mode == 'CTR' else 1
+
+    def process(self, blocks):
+        """ return the processed blocks, and the next previous value
+        """
+        return self.des.decipher_words(blocks, self.mode, self.previous)
+
+    def finalize(self):
+        """ Decipher the last block and remove the padding
+            (in CTR mode, decipher the last bytes)
+
+            return the last deciphered bytes
+        """
+        if self.mode == 'CTR':
+            return self._finalize_ctr()
+        if not self.buffer:
+            return b''
+        if len(self.buffer) % DES.BLOCK_SIZE != 0:
+            raise ValueError("the ciphertext length is not a multiple of the block size")
+        self.hold_back = 0
+        plaintext = self.update(b'')
+        # remove padding
+        padding_size = plaintext[-1]
+        if not 0 < padding_size <= DES.BLOCK_SIZE:
+            raise ValueError("invalid padding")
+        return plaintext[:len(plaintext) - padding_size]
+
+class DESNetwork(FeistelNetwork):
+    """ The Feistel network of DES: 32 bits halves, F is DES.round_function
+
+        Adaptation of FeistelNetwork for speed: rounds is overridden with F
+        inlined (the lookups in the SP tables), so func_f isn't called. The
+        generic rounds with DES.round_function give the same output, but
+        ciphering a block takes about a third longer (calls to F each round).
+    """
+
+    def __init__(self, subkeys_pieces):
+        """
+            Args:
+                subkeys_pieces -- tuple -- the subkeys cut by cut_subkey
+        """
+        FeistelNetwork.__init__(self, 32, DES.round_function, subkeys_pieces)
+
+    @staticmethod
+    def rounds(left, right, subkeys):
+        """ Run the rounds on the 2 halves of a block (after IP)
+
+            Args:
+                left -- int -- the 32 bits left half
+                right -- int -- the 32 bits right half
+                subkeys -- tuple -- the subkeys cut by cut_subkey, in the
+                    order of the rounds
+
+            return the 2 halves of the output, swapped back (before IP-1)
+        """
+        sp0, sp1, sp2, sp3, sp4, sp5, sp6, sp7 = SP
+        for k0, k1, k2, k3, k4, k5, k6, k7 in subkeys:
+            r = ((right >> 1) | (right << 31)) & 0xffffffff
+            left, right = right, left ^ (
+                sp0[(r >> 26) ^ k0] | sp1[((r >> 22) & 0x3f) ^ k1]
+                | sp2[((r >> 18) & 0x3f) ^ k2] | sp3[((r >> 14) & 0x3f) ^ k3]
+                | sp4[((r >> 10) & 0x3f) ^ k4] | sp5[((r >> 6) & 0x3f) ^ k5]
+                | sp6[((r >> 2) & 0x3f) ^ k6] | sp7[((r << 2) | (r >> 30)) & 0x3f ^ k7])
+        return right, left
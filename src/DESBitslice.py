@@ -0,0 +1,237 @@
+#!/usr/bin/env python3
+
+""" This module contains the DESBitslice class
+"""
+
+import struct
+from src.DES import (DES, IP, IPINV, E, P, SBOX)
+
+def sbox_circuit(sbox):
+    """ Describe an S-box as a boolean circuit
+
+        The 6 input bits are x0 (first one) to x5. For each group g of the 16
+        values of (x0, x1, x2, x3), an output bit is a function of (x4, x5)
+        only: its truth table is a 4 bits number (bit j set if the output is 1
+        for (x4, x5) = j). So an output bit is the OR, for each group, of the
+        group's minterm AND one of the 16 functions of (x4, x5).
+
+        Args:
+            sbox -- tuple of int -- the 64 values of the S-box
+
+        return for each of the 4 output bits (first one first), the list of
+        (group, truth table) with a truth table not null
+    """
+    circuit = []
+    for bit in range(4):
+        terms = []
+        for group in range(16):
+            table = 0
+            for j in range(4):
+                piece = (group << 2) | j
+                row = ((piece >> 4) & 0b10) | (piece & 1)
+                column = (piece >> 1) & 0xf
+                if (sbox[row*16 + column] >> (3 - bit)) & 1:
+                    table |= 1 << j
+            if table:
+                terms.append((group, table))
+        circuit.append(tuple(terms))
+    return tuple(circuit)
+
+SBOX_CIRCUITS = tuple(sbox_circuit(sbox) for sbox in SBOX)
+
+class DESBitslice(object):
+    """ Bitsliced DES: many blocks are ciphered at once
+
+        The blocks are transposed in 64 ints, one per bit position: the bit b
+        of the int p is the bit p of the block b. Then a xor of 2 ints is the
+        xor of a bit of all the blocks, the permutations (IP, E, P, IP-1) are
+        only renamings of the ints, and the S-boxes are evaluated as boolean
+        circuits (sbox_circuit) on all the blocks at once.
+
+        Python ints have no size limit, so a pass isn't limited to 64 blocks:
+        the cost of an operation grows slowly with the number of blocks.
+
+        Attributes:
+            des -- DES -- the instance giving the subkeys
+            width -- int -- the number of blocks ciphered in a pass
+            subkeys_bits -- tuple -- for each round, the 48 bits of the subkey
+    """
+
+    def __init__(self, des, width=1024):
+        """
+            Args:
+                des -- DES -- the instance giving the subkeys
+                width -- int -- the number of blocks ciphered in a pass
+        """
+        self.des = des
+        self.width = width
+        self.subkeys_bits = tuple(tuple((subkey >> (47 - j)) & 1 for j in range(48))
+                                  for subkey in des.subkeys)
+
+    @staticmethod
+    def transpose(blocks):
+        """ Transpose blocks in 64 ints, one per bit position
+
+            The transposition is done by zip on the binary strings of the blocks,
+            which is much faster in Python than moving each bit.
+
+            Args:
+                blocks -- list of int -- the 64 bits blocks
+
+            return the list of the 64 ints (the block 0 is the least significant bit)
+        """
+        rows = [format(block, '064b') for block in reversed(blocks)]
+        return [int(''.join(column), 2) for column in zip(*rows)]
+
+    @staticmethod
+    def untranspose(slices, nb_blocks):
+        """ Invert transpose
+
+            Args:
+                slices -- list of int -- the 64 ints, one per bit position
+                nb_blocks -- int -- the number of blocks
+
+            return the list of the 64 bits blocks
+        """
+        columns = [format(s, '0%db' % nb_blocks) for s in slices]
+        return [int(''.join(row), 2) for row in zip(*columns)][::-1]
+
+    @staticmethod
+    def sbox(circuit, x0, x1, x2, x3, x4, x5, ones):
+        """ Evaluate an S-box on all the blocks
+
+            Args:
+                circuit -- tuple -- the circuit of the S-box, made by sbox_circuit
+                x0, .., x5 -- int -- the input bits of all the blocks
+                ones -- int -- all the bits of the blocks set
+
+            return the 4 output bits of all the blocks (first one first)
+        """
+        n0, n1, n2, n3 = x0 ^ ones, x1 ^ ones, x2 ^ ones, x3 ^ ones
+        m01 = (n0 & n1, n0 & x1, x0 & n1, x0 & x1)
+        m23 = (n2 & n3, n2 & x3, x2 & n3, x2 & x3)
+        groups = [a & b for a in m01 for b in m23]
+        # the 16 functions of (x4, x5), by truth table
+        n4, n5 = x4 ^ ones, x5 ^ ones
+        m45 = (n4 & n5, n4 & x5, x4 & n5, x4 & x5)
+        functions = [0] * 16
+        for table in range(1, 16):
+            low = table & -table
+            functions[table] = functions[table ^ low] | m45[low.bit_length() - 1]
+        outputs = []
+        for terms in circuit:
+            output = 0
+            for group, table in terms:
+                output |= groups[group] & functions[table]
+            outputs.append(output)
+        return outputs
+
+    def run_rounds(self, slices, subkeys_bits, ones):
+        """ Run IP, the rounds and IP-1 on transposed blocks
+
+            Args:
+                slices -- list of int -- the 64 transposed ints
+                subkeys_bits -- sequence -- the bits of the subkeys, in the order
+                    of the rounds
+                ones -- int -- all the bits of the blocks set
+
+            return the 64 processed ints
+        """
+        block = [slices[i] for i in IP]
+        left, right = block[:32], block[32:]
+        sbox = self.sbox
+        for key_bits in subkeys_bits:
+            # E and the key mixing
+            mixed = [right[i] ^ ones if bit else right[i] for i, bit in zip(E, key_bits)]
+            substituted = []
+            for i, circuit in enumerate(SBOX_CIRCUITS):
+                substituted += sbox(circuit, *mixed[6*i:6*i+6], ones)
+            left, right = right, [l ^ substituted[i] for l, i in zip(left, P)]
+        block = right + left
+        return [block[i] for i in IPINV]
+
+    def _run(self, blocks, subkeys_bits):
+        """ Process blocks by passes of width blocks
+
+            return the list of processed blocks
+        """
+        processed = []
+        for start in range(0, len(blocks), self.width):
+            chunk = blocks[start:start + self.width]
+            ones = (1 << len(chunk)) - 1
+            slices = self.run_rounds(self.transpose(chunk), subkeys_bits, ones)
+            processed += self.untranspose(slices, len(chunk))
+        return processed
+
+    def encrypt_blocks(self, blocks):
+        """ Cipher blocks (ECB)
+
+            Args:
+                blocks -- list of int -- the 64 bits blocks
+
+            return the list of ciphered blocks
+        """
+        return self._run(blocks, self.subkeys_bits)
+
+    def decrypt_blocks(self, blocks):
+        """ Decipher blocks (ECB), with the subkeys in the reverse order
+
+            Args:
+                blocks -- list of int -- the 64 bits blocks
+
+            return the list of deciphered blocks
+        """
+        return self._run(blocks, self.subkeys_bits[::-1])
+
+    def cipher(self, data):
+        """ Cipher some blocks in ECB mode
+
+            Args:
+                data -- bytes -- the blocks, the length is a multiple of 8
+
+            return the ciphered bytes
+        """
+        nb_blocks = len(data) // DES.BLOCK_SIZE
+        blocks = list(struct.unpack('>%dQ' % nb_blocks, data))
+        return struct.pack('>%dQ' % nb_blocks, *self.encrypt_blocks(blocks))
+
+    def decipher(self, data):
+        """ Decipher some blocks in ECB mode
+
+            Args:
+                data -- bytes -- the blocks, the length is a multiple of 8
+
+            return the deciphered bytes
+        """
+        nb_blocks = len(data) // DES.BLOCK_SIZE
+        blocks = list(struct.unpack('>%dQ' % nb_blocks, data))
+        return struct.pack('>%dQ' % nb_blocks, *self.decrypt_blocks(blocks))
+
+    def keystream(self, counter, nb_blocks):
+        """ Generate blocks of keystream for the counter mode
+
+            Args:
+                counter -- int -- the counter of the first block
+                nb_blocks -- int -- the number of blocks to generate
+
+            return the list of keystream blocks
+        """
+        return self.encrypt_blocks([(counter + i) & 0xffffffffffffffff
+                                    for i in range(nb_blocks)])
+
+    def cipher_ctr(self, data, counter):
+        """ Cipher (or decipher) bytes in CTR mode, same output as DES.cipher_bytes
+
+            Args:
+                data -- bytes -- the data, of any length
+                counter -- int -- the counter of the first block
+
+            return the processed bytes
+        """
+        nb_blocks = -(-len(data) // DES.BLOCK_SIZE)
+        keystream = struct.pack('>%dQ' % nb_blocks, *self.keystream(counter, nb_blocks))
+        length = len(data)
+        result = int.from_bytes(data, 'big') ^ int.from_bytes(keystream[:length], 'big')
+        return result.to_bytes(length, 'big')
+
+    decipher_ctr = cipher_ctr
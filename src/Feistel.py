@@ -1,6 +1,7 @@
 #!/usr/bin/env python3
 
-""" This module contains the Feistel class
+""" This module contains the Feistel class (on bit strings) and the
+    FeistelNetwork class (on integers)
 """
 
 import src._utils as utils
@@ -60,3 +61,104 @@ class Feistel(object):
         for _ in range(nb_rounds):
             self.next_round()
         return self.get_ciphertext()
+
+class FeistelNetwork(object):
+    """ Feistel network on integers
+
+        A block of 2 * half_bits bits is cut in 2 halves, and each round does
+        left, right = right, left ^ F(subkey, right). The subkeys are given
+        (generated once), so the network can also decipher: the same rounds
+        with the subkeys in the reverse order. After the last round, the
+        halves are swapped back, so encrypt and decrypt are symmetric.
+
+        Attributes:
+            half_bits -- int -- the size of a half block, in bits
+            mask -- int -- half_bits bits set
+            func_f -- function -- the F function, called with a subkey and a half block
+            subkeys -- tuple -- the subkey of each round
+            inverse_subkeys -- tuple -- the subkeys in the reverse order
+    """
+
+    def __init__(self, half_bits, func_f, subkeys):
+        """
+            Args:
+                half_bits -- int -- the size of a half block, in bits
+                func_f -- function -- the F function, called with a subkey and a
+                    half block (int), returns a half block
+                subkeys -- sequence -- the subkey of each round
+        """
+        self.half_bits = half_bits
+        self.mask = (1 << half_bits) - 1
+        self.func_f = func_f
+        self.subkeys = tuple(subkeys)
+        self.inverse_subkeys = self.subkeys[::-1]
+
+    def rounds(self, left, right, subkeys):
+        """ Run the rounds on the 2 halves of a block
+
+            Args:
+                left -- int -- the left half
+                right -- int -- the right half
+                subkeys -- sequence -- the subkey of each round, in the order of the rounds
+
+            return the 2 halves of the output (swapped back after the last round)
+        """
+        func_f = self.func_f
+        for subkey in subkeys:
+            left, right = right, left ^ func_f(subkey, right)
+        return right, left
+
+    def encrypt(self, block):
+        """ Cipher a block
+
+            Args:
+                block -- int -- the block (2 * half_bits bits)
+
+            return the ciphered block, as int
+        """
+        left, right = self.rounds(block >> self.half_bits, block & self.mask, self.subkeys)
+        return (left << self.half_bits) | right
+
+    def decrypt(self, block):
+        """ Decipher a block: the rounds with the subkeys in the reverse order
+
+            Args:
+                block -- int -- the block (2 * half_bits bits)
+
+            return the deciphered block, as int
+        """
+        left, right = self.rounds(block >> self.half_bits, block & self.mask,
+                                  self.inverse_subkeys)
+        return (left << self.half_bits) | right
+
+    def encrypt_blocks(self, blocks):
+        """ Cipher many blocks
+
+            Args:
+                blocks -- sequence of int -- the blocks
+
+            return the list of ciphered blocks
+        """
+        return self._run_blocks(blocks, self.subkeys)
+
+    def decrypt_blocks(self, blocks):
+        """ Decipher many blocks
+
+            Args:
+                blocks -- sequence of int -- the blocks
+
+            return the list of deciphered blocks
+        """
+        return self._run_blocks(blocks, self.inverse_subkeys)
+
+    def _run_blocks(self, blocks, subkeys):
+        """ Run the rounds on many blocks, the attributes are read only once
+
+            return the list of processed blocks
+        """
+        rounds, half_bits, mask = self.rounds, self.half_bits, self.mask
+        processed = []
+        for block in blocks:
+            left, right = rounds(block >> half_bits, block & mask, subkeys)
+            processed.append((left << half_bits) | right)
+        return processed
@@ -0,0 +1,135 @@
+#!/usr/bin/env python3
+
+""" This module contains the HMAC class (HMAC-SHA1 and PBKDF2-HMAC-SHA1)
+"""
+
+from src.SHA1 import SHA1
+
+# padding of the inner and outer keys
+IPAD = 0x36
+OPAD = 0x5c
+# end of the block holding a 20 bytes digest after a block of key pad:
+# '1' bit, '0' bits, and the length of the message ((64+20)*8 bits)
+DIGEST_PADDING = (0x80000000,) + (0,) * 9 + (672,)
+
+class HMAC(object):
+    """ HMAC with SHA1, same interface as the hmac module objects
+
+        The key is xored with the inner and outer pads, and these 2 blocks are
+        hashed only once, when the object is created: the SHA1 midstates are
+        copied for each message. So a message costs 2 compressions less
+        than HMAC(key, message) = SHA1(key ^ opad + SHA1(key ^ ipad + message)).
+
+        Attributes:
+            name -- string -- the name of the algorithm
+            block_size -- int -- block size of SHA1, in bytes
+            digest_size -- int -- digest size, in bytes
+            _inner_start -- SHA1 -- midstate after the inner key pad
+            _outer_start -- SHA1 -- midstate after the outer key pad
+            _inner -- SHA1 -- the inner hash of the current message
+    """
+
+    name = 'hmac-sha1'
+    block_size = SHA1.block_size
+    digest_size = SHA1.digest_size
+
+    def __init__(self, key, msg=None):
+        """
+            Args:
+                key -- bytes or string -- the secret key
+                msg -- bytes or string -- first bytes of the message, optional
+        """
+        key = bytes(key, 'utf-8') if isinstance(key, str) else bytes(key)
+        # a long key is replaced by its hash
+        if len(key) > self.block_size:
+            key = SHA1(key).digest()
+        key = key.ljust(self.block_size, b'\x00')
+        self._inner_start = SHA1(bytes(k ^ IPAD for k in key))
+        self._outer_start = SHA1(bytes(k ^ OPAD for k in key))
+        self._inner = self._inner_start.copy()
+        if msg is not None:
+            self.update(msg)
+
+    def update(self, msg):
+        """ Add the next bytes of the message
+
+            Args:
+                msg -- bytes or string -- the next bytes of the message
+        """
+        self._inner.update(msg)
+
+    def copy(self):
+        """ return a copy of the current state (the midstates are shared)
+        """
+        other = HMAC.__new__(HMAC)
+        other._inner_start = self._inner_start
+        other._outer_start = self._outer_start
+        other._inner = self._inner.copy()
+        return other
+
+    def digest(self):
+        """ return the 20 bytes MAC of the message
+        """
+        outer = self._outer_start.copy()
+        outer.update(self._inner.digest())
+        return outer.digest()
+
+    def hexdigest(self):
+        """ return the MAC, as a string of 40 hexadecimal digits
+        """
+        return self.digest().hex()
+
+    def sign(self, msg):
+        """ Compute the MAC of another message with the same key,
+            without changing the current state
+
+            Args:
+                msg -- bytes or string -- the whole message
+
+            return the 20 bytes MAC
+        """
+        other = self.copy()
+        other._inner = self._inner_start.copy()
+        other.update(msg)
+        return other.digest()
+
+    @staticmethod
+    def pbkdf2(password, salt, iterations, dklen=None):
+        """ Derive a key from a password with PBKDF2-HMAC-SHA1
+
+            Same result as hashlib.pbkdf2_hmac('sha1', ..). The midstates of
+            the password are computed once, and each iteration is done with
+            only 2 compressions, directly on the words of the digests.
+
+            Args:
+                password -- bytes or string -- the password
+                salt -- bytes -- the salt
+                iterations -- int -- the number of iterations
+                dklen -- int -- the length of the derived key, in bytes (default: 20)
+
+            return the derived key, as bytes
+        """
+        if iterations < 1:
+            raise ValueError("the number of iterations must be at least 1")
+        dklen = dklen or HMAC.digest_size
+        hmac = HMAC(password)
+        inner_H = hmac._inner_start.export_state()['H']
+        outer_H = hmac._outer_start.export_state()['H']
+        # object used to run the compression function on the words
+        sha1 = SHA1()
+
+        key = b''
+        for i in range(1, -(-dklen // HMAC.digest_size) + 1):
+            u = hmac.sign(salt + i.to_bytes(4, 'big'))
+            t = list(int.from_bytes(u[j:j+4], 'big') for j in range(0, 20, 4))
+            u = t[:]
+            for _ in range(iterations - 1):
+                sha1._H = inner_H
+                sha1._process_block(u + list(DIGEST_PADDING))
+                inner = sha1._H
+                sha1._H = outer_H
+                sha1._process_block(inner + list(DIGEST_PADDING))
+                u = sha1._H
+                t = [a ^ b for a, b in zip(t, u)]
+            key += b''.join(word.to_bytes(4, 'big') for word in t)
+        return key[:dklen]
@@ -3,42 +3,115 @@
 """ This module contains the SHA1 class
 """
 
-from src._functions import rotl
+import struct
+from src._utils import iter_blocks
+
+# a block of 64 bytes, cut in 16 big endian words of 4 bytes
+BLOCK_STRUCT = struct.Struct('>16I')
+
+def generate_compression():
+    """ Generate the straight-line code of the compression function (the 80
+        rounds of a block)
+
+        The 16 last words of the message schedule are local variables (the
+        word i replaces the word i-16), the rotation of a, b, c, d and e
+        between the rounds is folded in the names of the variables, and the
+        round functions and constants are written in each round: there is no
+        loop, no list and no dispatch per round.
+
+        return the compression function, which takes the hash variables (list
+            of 5 int) and a block (16 int), and returns the new hash variables
+    """
+    mask = '0xffffffff'
+    lines = ['def compress(H, block):',
+             '    %s = block' % ', '.join('w%d' % i for i in range(16)),
+             '    a, b, c, d, e = H']
+    names = ['a', 'b', 'c', 'd', 'e']
+    for i in range(80):
+        a, b, c, d, e = names
+        if i >= 16:
+            # extend the schedule: rotl(w[i-3] ^ w[i-8] ^ w[i-14] ^ w[i-16], 1)
+            lines.append('    x = w%d ^ w%d ^ w%d ^ w%d'
+                         % ((i-3) % 16, (i-8) % 16, (i-14) % 16, i % 16))
+            lines.append('    w%d = ((x << 1) | (x >> 31)) & %s' % (i % 16, mask))
+        if i < 20:
+            f, k = '(%s ^ (%s & (%s ^ %s)))' % (d, b, c, d), '0x5a827999'
+        elif i < 40 or i >= 60:
+            f, k = '(%s ^ %s ^ %s)' % (b, c, d), '0x6ed9eba1' if i < 40 else '0xca62c1d6'
+        else:
+            f, k = '((%s & %s) | (%s & (%s | %s)))' % (b, c, d, b, c), '0x8f1bbcdc'
+        # the new a is written in the variable of e, b is rotated in place
+        lines.append('    %s = (((%s << 5) | (%s >> 27)) + %s + %s + %s + w%d) & %s'
+                     % (e, a, a, f, e, k, i % 16, mask))
+        lines.append('    %s = ((%s << 30) | (%s >> 2)) & %s' % (b, b, b, mask))
+        names = [e, a, b, c, d]
+    lines.append('    return [%s]' % ', '.join('(H[%d] + %s) & %s' % (i, name, mask)
+                                               for i, name in enumerate(names)))
+    namespace = {}
+    exec(compile('\n'.join(lines), '<sha1-compress>', 'exec'), namespace)
+    return namespace['compress']
+
+COMPRESS = generate_compression()
 
 class SHA1(object):
     """ SHA 1 hash algorithm implementation
 
+        The message can be given at once with hash(), or piece by piece with
+        update(): only the last incomplete block is kept in memory, so the
+        memory used doesn't depend on the size of the message.
+        The interface is the same as the hashlib objects.
+
         Attributes:
+            name -- string -- the name of the algorithm
             block_size -- int -- block size, in bytes
-            h -- list -- hash variables
+            digest_size -- int -- digest size, in bytes
+            _H -- list -- hash variables
+            _length -- int -- the number of bytes already given
+            _buffer -- bytearray -- the bytes not hashed yet (less than a block)
     """
 
-    def __init__(self):
+    name = 'sha1'
+    block_size = 64
+    digest_size = 20
+    # size of the pieces read from a file
+    CHUNK_SIZE = 65536
+
+    def __init__(self, data=None):
+        """
+            Args:
+                data -- bytes or string -- first bytes of the message, optional
+        """
         self.mask = 0xffffffff
         self._H = [0x67452301,
                    0xEFCDAB89,
                    0x98BADCFE,
                    0x10325476,
                    0xC3D2E1F0]
+        self._length = 0
+        self._buffer = bytearray()
+        if data is not None:
+            self.update(data)
 
     @staticmethod
-    def _padding(stream):
+    def _padding(stream, length=None):
         """
-            If the number of bits is not a multiple of 512, add some padding:
+            Add the padding (even if the length is a multiple of 512 bits):
                 - add '1' at the end of the text
                 - fill with '0' (but let 64 bits available at the end)
                 - the 64 last bits are the length of the original text
 
             Args:
                 stream -- bytearray -- the stream to hash
+                length -- int -- the length of the whole message, in bytes, if stream
+                    is only its end (default: the length of stream)
 
-            return stream, padded if needed
+            return the padded stream
         """
-        if len(stream) % 64 == 0:
-            return stream
+        if length is None:
+            length = len(stream)
 
         # get the original length in hexadecimal and split it in 8 bytes (list of 8 bytes)
-        original_length = [int((hex(len(stream)*8)[2:]).rjust(16, '0')[i:i+2], 16)
+        original_length = [int((hex(length*8)[2:]).rjust(16, '0')[i:i+2], 16)
                            for i in range(0, 16, 2)]
 
 
@@ -56,95 +129,152 @@ class SHA1(object):
             Cut the stream in blocks of 64 bytes, and each block in 16 words
             of 4 bytes
 
+            The words are read from a memoryview on the stream: it isn't copied
+
             Args:
                 stream -- bytearray -- the stream to hash
 
-            return a list of blocks
+            return an iterator of blocks (tuples of 16 int)
+        """
+        return iter_blocks(stream, BLOCK_STRUCT)
+
+    def update(self, data):
         """
-        blocks = []
-        nb_blocks = len(stream) // 64
+            Hash the next bytes of the message
 
-        for i in range(nb_blocks):
-            temp = []
-            for j in range(16):
-                # Calculate the value of the word and append it
-                value = 0
-                for k in range(4):
-                    value <<= 8
-                    value += stream[i*64 + j*4 + k]
-                temp.append(value)
-            blocks.append(temp)
+            Args:
+                data -- bytes or string -- the next bytes of the message
+        """
+        # convert data to bytes if needed
+        data = bytes(data, 'utf-8') if isinstance(data, str) else data
+        view = memoryview(data).cast('B')
+        self._length += len(view)
 
-        return blocks
+        # complete the block started by the previous bytes
+        if self._buffer:
+            missing = self.block_size - len(self._buffer)
+            self._buffer += view[:missing]
+            view = view[missing:]
+            if len(self._buffer) < self.block_size:
+                return
+            self._process_block(BLOCK_STRUCT.unpack(self._buffer))
+            self._buffer = bytearray()
 
-    def hash(self, stream):
+        # hash the complete blocks directly from the data,
+        # only the last incomplete block is copied
+        end = len(view) - len(view) % self.block_size
+        H = self._H
+        for block in self._prepare(view[:end]):
+            H = COMPRESS(H, block)
+        self._H = H
+        self._buffer = bytearray(view[end:])
+
+    def update_file(self, f, chunk_size=None, checkpoint=None):
         """
-            Hash the given stream
+            Hash the content of a file, read piece by piece
+
+            To resume an interrupted hash, create the object with from_state
+            and seek the file at the length saved in the state.
 
             Args:
-                stream -- string -- the text to hash
+                f -- file object -- opened in 'rb' mode, read until its end
+                chunk_size -- int -- the number of bytes read at once
+                checkpoint -- function -- called with the exported state after
+                    each piece, to save it
+        """
+        chunk = bytearray(chunk_size or self.CHUNK_SIZE)
+        view = memoryview(chunk)
+        size = f.readinto(chunk)
+        while size:
+            self.update(view[:size])
+            if checkpoint:
+                checkpoint(self.export_state())
+            size = f.readinto(chunk)
 
-            return the 40 bytes digest
+    def copy(self):
+        """ return a copy of the current state, to hash different endings
+            of a common beginning
         """
-        # convert stream to bytes if needed
-        stream = bytes(stream, 'utf-8') if isinstance(stream, str) else stream
-        # prepare the stream for hashing
-        stream = self._prepare(self._padding(stream))
+        other = SHA1.__new__(SHA1)
+        other.mask = self.mask
+        other._H = self._H[:]
+        other._length = self._length
+        other._buffer = bytearray(self._buffer)
+        return other
 
-        for block in stream:
-            self._process_block(block)
+    def export_state(self):
+        """ Export the midstate, to resume the hash later or in another process
 
-        return self.produce_digest()
+            The state only contains numbers and strings, it can be saved as JSON.
+            The length is also the position where the reading of a file must
+            be resumed.
 
+            return a dict with the hash variables, the number of bytes given
+            and the bytes not hashed yet (hexadecimal)
+        """
+        return {'H': self._H[:], 'length': self._length, 'buffer': self._buffer.hex()}
+
+    @classmethod
+    def from_state(cls, state):
+        """ Create a SHA1 object from an exported midstate
+
+            Args:
+                state -- dict -- made by export_state
+
+            return a SHA1 object, ready to get the next bytes of the message
+        """
+        buffer = bytearray.fromhex(state['buffer'])
+        H = [int(h) for h in state['H']]
+        if (len(H) != 5 or any(not 0 <= h <= 0xffffffff for h in H)
+                or len(buffer) != state['length'] % cls.block_size):
+            raise ValueError("invalid SHA1 state")
+        sha1 = cls()
+        sha1._H = H
+        sha1._length = state['length']
+        sha1._buffer = buffer
+        return sha1
+
+    def digest(self):
+        """ Finish the hash on a copy of the state, so more bytes can still be given
+
+            return the 20 bytes digest
+        """
+        final = self.copy()
+        for block in final._prepare(final._padding(final._buffer, final._length)):
+            final._process_block(block)
+        return struct.pack('>5I', *final._H)
+
+    def hexdigest(self):
+        """ return the digest, as a string of 40 hexadecimal digits
+        """
+        return self.digest().hex()
+
+    def hash(self, stream):
+        """
+            Hash the given stream
+
+            The stream is hashed alone, with a new state: the bytes given
+            before with update() are not used
+
+            Args:
+                stream -- string -- the text to hash
+
+            return the 40 hexadecimal digits digest
+        """
+        return SHA1(stream).hexdigest()
 
     def _process_block(self, block):
         """
             Process the current block and update the hash variable
 
             Args:
-                block -- list of int -- the block to hash
-        """
-        # => extend the block from 16 to 80 words
-        w = block[:]
-        for i in range(16, 80):
-            w.append(rotl(w[i-3] ^ w[i-8] ^ w[i-14] ^ w[i-16]) & self.mask)
-
-        # initialize hash value for this block
-        a, b, c, d, e = self._H[:]
-
-        # main loop
-        for i in range(80):
-            if i <= 19:
-                f = (b & c) ^ (~b & d)
-                k = 0x5a827999
-            elif i <= 39:
-                f = b ^ c ^ d
-                k = 0x6ed9eba1
-            elif i <= 59:
-                f = (b & c) ^ (b & d) ^ (c & d)
-                k = 0x8f1bbcdc
-            else:
-                f = b ^ c ^ d
-                k = 0xca62c1d6
-
-            T = ((rotl(a, 5) + f + e + k + w[i]) & self.mask)
-            e = d
-            d = c
-            c = rotl(b, 30) & self.mask
-            b = a
-            a = T
-
-        # add the block hash to the result
-        self._H[0] = (a + self._H[0]) & self.mask
-        self._H[1] = (b + self._H[1]) & self.mask
-        self._H[2] = (c + self._H[2]) & self.mask
-        self._H[3] = (d + self._H[3]) & self.mask
-        self._H[4] = (e + self._H[4]) & self.mask
+                block -- tuple of int -- the block to hash
+        """
+        self._H = COMPRESS(self._H, block)
 
     def produce_digest(self):
         """ Combine the 5 hash variables to produce the final hash
 
             return the 160 bits length hash
         """
-        # return 5 blocks of 8 hexadecimal digits
-        return ''.join([('%08x' % h) for h in self._H])
+        return self.hexdigest()
@@ -0,0 +1,133 @@
+#!/usr/bin/env python3
+
+""" This module contains the SHA1Batch class
+
+    NumPy is optional: if it's not installed, SHA1Batch.available()
+    returns False and the messages must be hashed one by one with SHA1.
+"""
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+from src.SHA1 import SHA1
+
+class SHA1Batch(object):
+    """ SHA 1 on many messages at once
+
+        Each message is a lane of a (N, 16) uint32 matrix: the block i of all
+        the messages is hashed at once, each step of the compression function
+        being done on the whole column of words. The lanes are sorted from the
+        longest message to the shortest, so the lanes which still have a block
+        i are the first ones: the shorter messages are left out of the next
+        columns. Only the column being hashed is loaded as an array, never all
+        the messages padded to the longest one.
+    """
+
+    # the initial hash variables
+    H = (0x67452301, 0xEFCDAB89, 0x98BADCFE, 0x10325476, 0xC3D2E1F0)
+    # the constant of each group of 20 rounds
+    K = (0x5a827999, 0x6ed9eba1, 0x8f1bbcdc, 0xca62c1d6)
+
+    @staticmethod
+    def available():
+        """ return True if NumPy is installed
+        """
+        return np is not None
+
+    @staticmethod
+    def load(messages):
+        """ Pad the messages and sort them from the longest to the shortest
+
+            Args:
+                messages -- list of bytes -- the messages to hash
+
+            return the padded messages (sorted), their number of blocks, and
+            the index of each of them in messages
+        """
+        padded = [bytes(SHA1._padding(bytearray(message))) for message in messages]
+        order = sorted(range(len(padded)), key=lambda i: len(padded[i]), reverse=True)
+        padded = [padded[i] for i in order]
+        return padded, [len(message) // 64 for message in padded], order
+
+    @staticmethod
+    def column(padded, i, count):
+        """ Cut the block i of the first messages
+
+            Args:
+                padded -- list of bytes -- the padded messages
+                i -- int -- the index of the block
+                count -- int -- the number of messages (the first ones)
+
+            return a (count, 16) uint32 array
+        """
+        data = b''.join([message[i*64:(i+1)*64] for message in padded[:count]])
+        return np.frombuffer(data, dtype='>u4').astype(np.uint32).reshape(count, 16)
+
+    @staticmethod
+    def rotl(x, n):
+        """ Rotate to the left the 32 bits words of an array
+        """
+        return (x << np.uint32(n)) | (x >> np.uint32(32 - n))
+
+    def process_blocks(self, H, blocks):
+        """ Hash a block of each lane
+
+            Args:
+                H -- numpy array -- (5, N) uint32 array, the hash variables of the lanes
+                blocks -- numpy array -- (N, 16) uint32 array
+
+            return the new hash variables, as a (5, N) uint32 array
+        """
+        # extend the blocks from 16 to 80 words
+        w = [blocks[:, i] for i in range(16)]
+        for i in range(16, 80):
+            w.append(self.rotl(w[i-3] ^ w[i-8] ^ w[i-14] ^ w[i-16], 1))
+
+        a, b, c, d, e = H
+        for i in range(80):
+            if i <= 19:
+                f = (b & c) | (~b & d)
+            elif i <= 39 or i >= 60:
+                f = b ^ c ^ d
+            else:
+                f = (b & c) | (b & d) | (c & d)
+            T = self.rotl(a, 5) + f + e + np.uint32(self.K[i // 20]) + w[i]
+            e, d, c, b, a = d, c, self.rotl(b, 30), a, T
+
+        return H + np.array([a, b, c, d, e])
+
+    def digests(self, messages):
+        """ Hash the messages
+
+            Args:
+                messages -- list of bytes -- the messages to hash
+
+            return the list of the 20 bytes digests
+        """
+        if not messages:
+            return []
+        padded, nb_blocks, order = self.load(messages)
+        H = np.tile(np.array(self.H, dtype=np.uint32).reshape(5, 1), len(messages))
+        count = len(padded)
+        for i in range(nb_blocks[0]):
+            # the lanes without a block i keep their hash variables
+            while nb_blocks[count-1] <= i:
+                count -= 1
+            H[:, :count] = self.process_blocks(H[:, :count], self.column(padded, i, count))
+        digests = [None] * len(messages)
+        for index, digest in zip(order, H.T.astype('>u4')):
+            digests[index] = digest.tobytes()
+        return digests
+
+    def hash(self, messages):
+        """ Hash the messages
+
+            Args:
+                messages -- list of bytes or string -- the messages to hash
+
+            return the list of the 40 hexadecimal digits digests
+        """
+        messages = [bytes(m, 'utf-8') if isinstance(m, str) else m for m in messages]
+        return [digest.hex() for digest in self.digests(messages)]
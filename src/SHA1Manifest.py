@@ -0,0 +1,173 @@
+#!/usr/bin/env python3
+
+""" This module contains the SHA1Manifest class
+"""
+
+import os
+import json
+import time
+from src.SHA1 import SHA1
+from src import _backends
+from src._parallel import run_in_processes
+
+class SHA1Manifest(object):
+    """ Manifest of the files of a directory tree: path, size, mtime and SHA1
+
+        The files are hashed by a pool of processes, each file being read piece
+        by piece. When the tree is verified again, only the files whose size
+        or mtime changed are hashed again.
+
+        Attributes:
+            root -- string -- the directory described by the manifest
+            entries -- dict -- relative path -> {'size', 'mtime', 'sha1'}
+            stats -- dict -- files and bytes hashed by the last build/verify,
+                the duration, the throughput in MB/s and files/s, the SHA1 backend
+    """
+
+    # number of files sent at once to a process
+    BATCH_FILES = 32
+
+    def __init__(self, root, entries=None):
+        """
+            Args:
+                root -- string -- the directory described by the manifest
+                entries -- dict -- relative path -> {'size', 'mtime', 'sha1'}
+        """
+        self.root = root
+        self.entries = entries or {}
+        self.stats = {}
+
+    def scan(self):
+        """ Walk the directory tree
+
+            return relative path -> (size, mtime in ns), for all the files
+        """
+        files = {}
+        for directory, _, names in os.walk(self.root):
+            for name in names:
+                path = os.path.join(directory, name)
+                info = os.stat(path)
+                files[os.path.relpath(path, self.root).replace(os.sep, '/')] = \
+                    (info.st_size, info.st_mtime_ns)
+        return files
+
+    def hash_files(self, paths, workers=None):
+        """ Hash some files of the tree, with a pool of processes
+
+            Args:
+                paths -- list of string -- the relative paths of the files
+                workers -- int -- the number of processes, None for the number of cores
+
+            return relative path -> hexadecimal digest
+        """
+        start = time.perf_counter()
+        full_paths = [os.path.join(self.root, path) for path in paths]
+        tasks = [full_paths[i:i+self.BATCH_FILES]
+                 for i in range(0, len(full_paths), self.BATCH_FILES)]
+        digests = [digest for batch in run_in_processes(_hash_files, tasks, workers=workers)
+                   for digest in batch]
+        duration = time.perf_counter() - start
+
+        nb_bytes = sum(os.path.getsize(path) for path in full_paths)
+        self.stats = {
+            'files': len(paths),
+            'bytes': nb_bytes,
+            'seconds': duration,
+            'mb_per_s': nb_bytes / duration / 1e6 if duration else 0.0,
+            'files_per_s': len(paths) / duration if duration else 0.0,
+            'backend': _backends.select('sha1')[0],
+        }
+        return dict(zip(paths, digests))
+
+    def build(self, workers=None):
+        """ Hash all the files of the tree, and replace the entries
+
+            Args:
+                workers -- int -- the number of processes, None for the number of cores
+        """
+        files = self.scan()
+        digests = self.hash_files(sorted(files), workers)
+        self.entries = {path: {'size': size, 'mtime': mtime, 'sha1': digests[path]}
+                        for path, (size, mtime) in files.items()}
+
+    def verify(self, workers=None, full=False, update=False):
+        """ Compare the tree with the manifest
+
+            The files with the same size and mtime as in the manifest are
+            considered unchanged, without being hashed (unless full is True).
+
+            Args:
+                workers -- int -- the number of processes, None for the number of cores
+                full -- boolean -- if True, hash all the files
+                update -- boolean -- if True, write the new sizes, mtimes and digests
+                    in the manifest, and remove the missing files
+
+            return a dict: 'ok', 'modified', 'missing' and 'new', sorted lists of
+            relative paths
+        """
+        files = self.scan()
+        to_hash = sorted(path for path, (size, mtime) in files.items()
+                         if path not in self.entries or full
+                         or (size, mtime) != (self.entries[path]['size'],
+                                              self.entries[path]['mtime']))
+        digests = self.hash_files(to_hash, workers)
+
+        result = {'ok': [], 'modified': [], 'missing': [], 'new': []}
+        for path in sorted(files):
+            if path not in self.entries:
+                result['new'].append(path)
+            elif path in digests and digests[path] != self.entries[path]['sha1']:
+                result['modified'].append(path)
+            else:
+                result['ok'].append(path)
+        result['missing'] = sorted(set(self.entries) - set(files))
+
+        if update:
+            for path in result['missing']:
+                del self.entries[path]
+            for path, digest in digests.items():
+                size, mtime = files[path]
+                self.entries[path] = {'size': size, 'mtime': mtime, 'sha1': digest}
+        return result
+
+    def save(self, path):
+        """ Write the manifest in a JSON file
+
+            Args:
+                path -- string -- the path of the manifest
+        """
+        with open(path, "w") as f:
+            json.dump({'root': self.root, 'entries': self.entries}, f,
+                      indent=1, sort_keys=True)
+
+    @classmethod
+    def load(cls, path, root=None):
+        """ Read a manifest written by save
+
+            Args:
+                path -- string -- the path of the manifest
+                root -- string -- the directory to verify, by default the one
+                    saved in the manifest
+
+            return a SHA1Manifest
+        """
+        with open(path) as f:
+            manifest = json.load(f)
+        return cls(root or manifest['root'], manifest['entries'])
+
+def _hash_files(paths):
+    """ Hash some files, read piece by piece, with the selected SHA1 backend
+
+        Args:
+            paths -- list of string -- the paths of the files
+
+        return the list of hexadecimal digests
+    """
+    digests = []
+    for path in paths:
+        sha1 = _backends.get('sha1')()
+        with open(path, "rb") as f:
+            for chunk in iter(lambda: f.read(SHA1.CHUNK_SIZE), b''):
+                sha1.update(chunk)
+        digests.append(sha1.hexdigest())
+    return digests
@@ -1,10 +1,82 @@
 #!/usr/bin/python3
 
-""" This module contains the Threefish class
+""" This module contains the Threefish class, the KeyScheduleCache class, and
+    the ThreefishEncryptor and ThreefishDecryptor classes to cipher/decipher
+    a stream chunk by chunk
 """
 
-from src._utils import (bytearray_to_int, add_padding)
-from src._functions import rotl, rotr
+import os
+import mmap
+import struct
+import threading
+from collections import OrderedDict
+from src._utils import (bytearray_to_int, add_padding, iter_blocks, cut_blocks,
+                        run_file)
+from src._parallel import (split_in_shards, run_in_processes)
+from src.ThreefishBatch import ThreefishBatch
+
+class KeyScheduleCache(object):
+    """ LRU cache of the generated rounds keys
+
+        The rounds keys only depend on the block size, the key and the tweaks,
+        and are stored as tuples, so they can be shared by many instances
+        (and threads).
+
+        Attributes:
+            maxsize -- int -- the maximum number of rounds keys stored
+            hits -- int -- the number of times rounds keys were found in the cache
+            misses -- int -- the number of times rounds keys had to be generated
+    """
+
+    def __init__(self, maxsize=128):
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self._schedules = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, block_size, key, tweaks):
+        """ Get the rounds keys from the cache, or generate them
+
+            Args:
+                block_size -- integer -- the size of a block, in bytes
+                key -- bytes -- the key
+                tweaks -- list of int -- the 3 tweaks
+
+            return the rounds keys, as a tuple of tuple of int
+        """
+        cache_key = (block_size, bytes(key), tuple(tweaks))
+        with self._lock:
+            rounds_keys = self._schedules.get(cache_key)
+            if rounds_keys is not None:
+                self.hits += 1
+                self._schedules.move_to_end(cache_key)
+                return rounds_keys
+            self.misses += 1
+
+        rounds_keys = Threefish.generate_rounds_keys(block_size, key, tweaks)
+
+        with self._lock:
+            self._schedules[cache_key] = rounds_keys
+            # remove the least recently used rounds keys
+            while len(self._schedules) > self.maxsize:
+                self._schedules.popitem(last=False)
+        return rounds_keys
+
+    def info(self):
+        """ return the hits, misses, current size and maximum size of the cache
+        """
+        with self._lock:
+            return {'hits': self.hits, 'misses': self.misses,
+                    'size': len(self._schedules), 'maxsize': self.maxsize}
+
+    def clear(self):
+        """ Remove all the rounds keys and reset the counters
+        """
+        with self._lock:
+            self._schedules.clear()
+            self.hits = 0
+            self.misses = 0
 
 class Threefish(object):
     """ Threefish implementation
@@ -17,19 +89,39 @@ class Threefish(object):
             P -- tuple of int -- permutation table for the permutation function
             NB_ROUNDS -- integer -- the number of rounds
             NB_ROTATIONS -- integer -- the number of rotations to do in the mix function
+            CHUNK_SIZE -- integer -- the number of bytes read at once from a file
+            SHARD_BLOCKS -- integer -- default number of blocks sent at once to a
+                process, in parallel mode
+            MMAP_REGION -- integer -- the size of a region of a memory-mapped file
+                processed at once (multiple of the page size)
+            BATCH_BLOCKS -- integer -- from this number of blocks, the NumPy engine
+                (ThreefishBatch) is used when it's available. None to disable it
+            SCHEDULE_CACHE -- KeyScheduleCache -- the rounds keys already generated
 
         Attributes:
             block_size -- integer -- 32, 64 or 128 -- the size of a block, in bytes
             key -- bytes -- same length as block_size
             tweaks -- bytes -- used in the rounds's keys generation
+            rounds_keys -- tuple of tuple of int -- the 20 rounds keys, as 64 bits words
+            block_struct -- struct.Struct -- packs/unpacks a block to/from its words
+
+        Inside the rounds, a block is a list of 64 bits words (int). The bytes are
+        only converted to words when the block is loaded, and back to bytes when the
+        block is emitted.
     """
 
-    C = bytearray.fromhex("1bd11bdaa9fc1a22")
+    C = 0x1bd11bdaa9fc1a22
     W_LEN = 8
     MASK = 0xffffffffffffffff
     P = (1, 0, 3, 2, 5, 4, 7, 6, 9, 8, 11, 10, 13, 12, 15, 14)
     NB_ROUNDS = 76
     NB_ROTATIONS = 49
+    CHUNK_SIZE = 65536
+    SHARD_BLOCKS = 1024
+    MMAP_REGION = 1 << 20
+    BATCH_BLOCKS = 16
+    # generated round functions, by number of words in a block (and tweakable or not)
+    _ROUND_FUNCTIONS = {}
 
     def __init__(self, block_size, u_key):
         """
@@ -48,71 +140,84 @@ class Threefish(object):
         # generate the third tweak
         self.tweaks[2] = self.tweaks[0] + self.tweaks[1]
         self.rounds_keys = None
+        self.block_struct = struct.Struct('>%dQ' % (self.block_size // self.W_LEN))
+        # the generated rounds, for this block size
+        self._encrypt, self._decrypt = self.generate_round_functions(self.block_size // self.W_LEN)
+
+    @classmethod
+    def from_rounds_keys(cls, block_size, rounds_keys):
+        """ Create an instance from already generated rounds keys,
+            without the user's key
+
+            Args:
+                block_size -- integer -- 32, 64 or 128 -- the size of a block, in bytes
+                rounds_keys -- list of list of int -- the 20 rounds keys
+
+            return a Threefish instance, ready to cipher/decipher
+        """
+        threefish = cls(block_size, bytes(block_size + 2*cls.W_LEN))
+        threefish.key = None
+        threefish.tweaks = None
+        threefish.rounds_keys = rounds_keys
+        return threefish
 
     def key_schedule(self):
+        """ Generate the 20 keys used in the rounds, or get them from the cache
+        """
+        self.rounds_keys = Threefish.SCHEDULE_CACHE.get(self.block_size, self.key, self.tweaks)
+
+    @staticmethod
+    def generate_rounds_keys(block_size, key, tweaks):
         """ Generate the 20 keys used in the rounds
+
+            Args:
+                block_size -- integer -- the size of a block, in bytes
+                key -- bytes -- same length as block_size
+                tweaks -- list of int -- the 3 tweaks
+
+            return the rounds keys, as a tuple of tuple of int
         """
+        words_per_block = block_size // Threefish.W_LEN
         # cut the key in words and generate the last word of the key
-        key_words = []
-        next_word = self.C
-        for i in range(0, self.block_size // self.W_LEN):
-            key_words.append(self.key[i*self.W_LEN:(i+1)*self.W_LEN])
-            for j in range(self.W_LEN):
-                next_word[j] ^= key_words[i][j]
+        key_words = [bytearray_to_int(key[i*Threefish.W_LEN:(i+1)*Threefish.W_LEN])
+                     for i in range(words_per_block)]
+        next_word = Threefish.C
+        for word in key_words:
+            next_word ^= word
         key_words.append(next_word)
         # generate the rounds's keys
-        words_per_block = self.block_size // self.W_LEN
-        self.rounds_keys = []
+        rounds_keys = []
         for i in range(20):
-            round_keys = []
-            for n in range(0, words_per_block-3):
-                next_round_key = key_words[(i+n) % (words_per_block+1)]
-                round_keys.append(bytearray_to_int(next_round_key))
+            round_keys = [key_words[(i+n) % (words_per_block+1)]
+                          for n in range(0, words_per_block-3)]
 
             next_round_key = key_words[(i+words_per_block-3) % (words_per_block+1)]
-            next_round_key = bytearray_to_int(next_round_key)
-            next_round_key = (next_round_key + self.tweaks[i % 3]) & Threefish.MASK
-            round_keys.append(next_round_key)
+            round_keys.append((next_round_key + tweaks[i % 3]) & Threefish.MASK)
 
             next_round_key = key_words[(i+words_per_block-2) % (words_per_block+1)]
-            next_round_key = bytearray_to_int(next_round_key)
-            next_round_key = (next_round_key + self.tweaks[(i+1) % 3]) & Threefish.MASK
-            round_keys.append(next_round_key)
+            round_keys.append((next_round_key + tweaks[(i+1) % 3]) & Threefish.MASK)
 
             next_round_key = key_words[(i+words_per_block-1) % (words_per_block+1)]
-            next_round_key = bytearray_to_int(next_round_key)
-            next_round_key = (next_round_key + i) & Threefish.MASK
-            round_keys.append(next_round_key)
+            round_keys.append((next_round_key + i) & Threefish.MASK)
 
-            self.rounds_keys.append(round_keys)
+            rounds_keys.append(tuple(round_keys))
 
-        # cast every keys in bytes
-        for j in range(len(self.rounds_keys)):
-            for k in range(len(self.rounds_keys[j])):
-                self.rounds_keys[j][k] = self.rounds_keys[j][k].to_bytes((self.rounds_keys[j][k].bit_length() + 7) // 8, 'big')
+        return tuple(rounds_keys)
 
     @staticmethod
     def mix(m1, m2):
         """ mix 2 words
 
             Args:
-                m1 -- bytes -- a word
-                m2 -- bytes -- another word
+                m1 -- int -- a 64 bits word
+                m2 -- int -- another 64 bits word
 
             return a tuple, with the 2 mixed words
         """
-        # sum in int
-        new_m1 = (int.from_bytes(m1, 'big') + int.from_bytes(m2, 'big')) & Threefish.MASK
-
-        # Make the rotation in int
-        new_rot = rotl(int.from_bytes(m2, byteorder='big'), rotations=Threefish.NB_ROTATIONS, w=Threefish.W_LEN*8)
-
-        # Xor new_m1 with new_rot
-        new_m2 = new_m1 ^ new_rot
-
-        # Cast back in bytes
-        new_m1 = new_m1.to_bytes((new_m1.bit_length() + 7) // 8, 'big')
-        new_m2 = new_m2.to_bytes((new_m2.bit_length() + 7) // 8, 'big')
+        new_m1 = (m1 + m2) & Threefish.MASK
+        # rotate m2 to the left, and xor it with the new m1
+        new_m2 = new_m1 ^ (((m2 << Threefish.NB_ROTATIONS)
+                            | (m2 >> (64 - Threefish.NB_ROTATIONS))) & Threefish.MASK)
         return(new_m1, new_m2)
 
     @staticmethod
@@ -120,23 +225,18 @@ class Threefish(object):
         """ invert the mix on 2 words
 
             Args:
-                m1 -- bytes -- a word
-                m2 -- bytes -- another word
+                m1 -- int -- a 64 bits word
+                m2 -- int -- another 64 bits word
 
             return a tuple, with the 2 unmixed words
         """
-        # Cast to int and xor back to get m2 after rotl
-        temp_m2 = int.from_bytes(m1, 'big') ^ int.from_bytes(m2, 'big')
-
-        # Make the rotr to cancel rotl
-        new_rot = rotr(temp_m2, rotations=Threefish.NB_ROTATIONS, w=Threefish.W_LEN*8)
-
-        # Retrieve m1 by substracting m2
-        new_m1 = ((int.from_bytes(m1, 'big')) - new_rot) & Threefish.MASK
-
-        # Cast back to bytes
-        new_m1 = new_m1.to_bytes((new_m1.bit_length() + 7) // 8, 'big')
-        new_m2 = new_rot.to_bytes((new_rot.bit_length() + 7) // 8, 'big')
+        # xor back to get m2 after rotl
+        temp_m2 = m1 ^ m2
+        # rotate to the right to cancel rotl
+        new_m2 = ((temp_m2 >> Threefish.NB_ROTATIONS)
+                  | (temp_m2 << (64 - Threefish.NB_ROTATIONS))) & Threefish.MASK
+        # retrieve m1 by substracting m2
+        new_m1 = (m1 - new_m2) & Threefish.MASK
         return(new_m1, new_m2)
 
     @staticmethod
@@ -144,7 +244,7 @@ class Threefish(object):
         """ permute the given block using the permutation table
 
             Args:
-                block -- list of bytes -- a block
+                block -- list of int -- a block
 
             return the block permuted
         """
@@ -155,7 +255,7 @@ class Threefish(object):
         """ permute the given block using the permutation table
 
             Args:
-                block -- list of bytes -- a block
+                block -- list of int -- a block
                 mix_function -- function -- the mix function to call
 
             return the block substitute
@@ -169,7 +269,9 @@ class Threefish(object):
     @staticmethod
     def blockify(text, block_size):
         """ Cut the given text in a list of blocks,
-            and each blocks in a list of words
+            and each blocks in a tuple of 64 bits words
+
+            The words are read from a memoryview on the text: the text isn't copied
 
             Args:
                 text -- bytes -- the bytes string to cut in block
@@ -177,27 +279,16 @@ class Threefish(object):
 
             return a list: the text cutted in blocks
         """
-        blocks = []
-        # for each block we can make from the text
-        for i in range(0, len(text)//block_size):
-            # get the block
-            block = text[(i*block_size):((i+1)*block_size)]
-            # cut the block in words
-            words = [block[(j*Threefish.W_LEN):((j+1)*Threefish.W_LEN)]
-                     for j in range(0, block_size // Threefish.W_LEN)]
-            # append the words to the list of blocks
-            blocks.append(words)
-
-        return blocks
+        return list(iter_blocks(text, struct.Struct('>%dQ' % (block_size // Threefish.W_LEN))))
 
     @staticmethod
     def threefish_round(block):
         """ take a block and make 1 round (substitution + permutation) on it
 
             Args:
-                block -- list of bytes -- the block to round
+                block -- list of int -- the block to round
 
-            return a list of bytes: the block after the round
+            return a list of int: the block after the round
         """
         # Subsitution: mix each pair of words in the given block
         block = Threefish.substitute(block, Threefish.mix)
@@ -211,9 +302,9 @@ class Threefish(object):
         """ take a block and make 1 inverted round (permutation + substitution) on it
 
             Args:
-                block -- list of bytes -- the block to invert 1 round
+                block -- list of int -- the block to invert 1 round
 
-            return a list of bytes: the block after the inverted round
+            return a list of int: the block after the inverted round
         """
         # Permutation
         block = Threefish.permute(block)
@@ -227,16 +318,243 @@ class Threefish(object):
         """ xor a block with a key
 
             Args:
-                block -- list of bytes
-                key -- list of bytes
+                block -- list of int
+                key -- list of int
 
-            return the block after xor on each words
+            return a new block, after xor on each words
         """
-        # Go through words and xor key
-        for j, word in enumerate(block):
-            temp_to_cipher = (int.from_bytes(word, 'big')) ^ (int.from_bytes(key[j], 'big'))
-            block[j] = temp_to_cipher.to_bytes((temp_to_cipher.bit_length() + 7) // 8, 'big')
-        return block
+        return [word ^ key_word for word, key_word in zip(block, key)]
+
+    @staticmethod
+    def generate_round_functions(words, tweakable=False):
+        """ Generate the straight-line code of the 76 rounds for a block of the
+            given number of words, in both directions
+
+            The code works on local variables: the permutation is folded in the
+            order of the variables (no code is generated for it), and the rotation
+            and the mask are constants. The functions are cached for each number
+            of words.
+
+            The tweakable functions take the 3 tweaks as a third argument, and
+            add them to the rounds keys (generated with the tweaks at 0) while
+            injecting them: the tweaks can change at each block without
+            building new rounds keys.
+
+            Args:
+                words -- int -- 4, 8 or 16 -- the number of words in a block
+                tweakable -- bool -- True to generate the tweakable functions
+
+            return the cipher and decipher functions, which take a block (list of
+                int), the rounds keys (and the tweaks), and return the new block
+                (list of int)
+        """
+        if (words, tweakable) in Threefish._ROUND_FUNCTIONS:
+            return Threefish._ROUND_FUNCTIONS[words, tweakable]
+
+        mask = hex(Threefish.MASK)
+        rot = Threefish.NB_ROTATIONS
+        permutation = Threefish.P[:words]
+        keys = ', '.join('k%d' % i for i in range(words))
+
+        def inject(lines, names, index):
+            # xor each word with the subkey of the given index
+            lines.append('    %s = rounds_keys[%d]' % (keys, index))
+            for i, name in enumerate(names):
+                if tweakable and i == words-3:
+                    lines.append('    %s ^= (k%d + t%d) & %s' % (name, i, index % 3, mask))
+                elif tweakable and i == words-2:
+                    lines.append('    %s ^= (k%d + t%d) & %s' % (name, i, (index+1) % 3, mask))
+                else:
+                    lines.append('    %s ^= k%d' % (name, i))
+
+        arguments = 'block, rounds_keys, tweaks' if tweakable else 'block, rounds_keys'
+        header = ['    %s = block' % ', '.join('w%d' % i for i in range(words))]
+        if tweakable:
+            header.append('    t0, t1, t2 = tweaks')
+
+        def mix(lines, names):
+            for i in range(0, words, 2):
+                m1, m2 = names[i], names[i+1]
+                lines.append('    %s = (%s + %s) & %s' % (m1, m1, m2, mask))
+                lines.append('    %s = (((%s << %d) | (%s >> %d)) & %s) ^ %s'
+                             % (m2, m2, rot, m2, 64 - rot, mask, m1))
+            # permutation: only the names change
+            return [names[permutation[i]] for i in range(words)]
+
+        def mix_inv(lines, names):
+            # permutation: only the names change
+            names = [names[permutation[i]] for i in range(words)]
+            for i in range(0, words, 2):
+                m1, m2 = names[i], names[i+1]
+                lines.append('    %s ^= %s' % (m2, m1))
+                lines.append('    %s = ((%s >> %d) | (%s << %d)) & %s'
+                             % (m2, m2, rot, m2, 64 - rot, mask))
+                lines.append('    %s = (%s - %s) & %s' % (m1, m1, m2, mask))
+            return names
+
+        variables = ['w%d' % i for i in range(words)]
+
+        # cipher: a subkey every 4 rounds, and the last one before the last round
+        names = variables
+        lines = ['def encrypt(%s):' % arguments] + header
+        for j in range(Threefish.NB_ROUNDS-1):
+            if j % 4 == 0:
+                inject(lines, names, j//4)
+            names = mix(lines, names)
+        inject(lines, names, Threefish.NB_ROUNDS//4)
+        names = mix(lines, names)
+        lines.append('    return [%s]' % ', '.join(names))
+
+        # decipher: the same steps, inverted and in reverse order
+        names = variables
+        lines += ['def decrypt(%s):' % arguments] + header
+        names = mix_inv(lines, names)
+        inject(lines, names, Threefish.NB_ROUNDS//4)
+        for j in range(Threefish.NB_ROUNDS-2, -1, -1):
+            names = mix_inv(lines, names)
+            if j % 4 == 0:
+                inject(lines, names, j//4)
+        lines.append('    return [%s]' % ', '.join(names))
+
+        namespace = {}
+        exec(compile('\n'.join(lines), '<threefish-%d>' % words, 'exec'), namespace)
+        Threefish._ROUND_FUNCTIONS[words, tweakable] = (namespace['encrypt'],
+                                                        namespace['decrypt'])
+        return Threefish._ROUND_FUNCTIONS[words, tweakable]
+
+    def encrypt_block(self, block, rounds_keys=None):
+        """ Run the 76 rounds on a block
+
+            Args:
+                block -- list of int -- the words of the block to cipher
+                rounds_keys -- tuple of tuple of int -- other rounds keys to use
+                    (with other tweaks), by default the rounds keys of the instance
+
+            return the ciphered block, as a list of int
+        """
+        return self._encrypt(block, rounds_keys or self.rounds_keys)
+
+    def decrypt_block(self, block, rounds_keys=None):
+        """ Invert the 76 rounds on a block
+
+            Args:
+                block -- list of int -- the words of the block to decipher
+                rounds_keys -- tuple of tuple of int -- other rounds keys to use
+                    (with other tweaks), by default the rounds keys of the instance
+
+            return the deciphered block, as a list of int
+        """
+        return self._decrypt(block, rounds_keys or self.rounds_keys)
+
+    def cipher_blocks(self, blocks, previous=None):
+        """ Cipher a list of blocks
+
+            Args:
+                blocks -- iterable of list of int -- the blocks to cipher
+                previous -- list of int -- in CBC mode, the block to xor with
+                    the first block (the IV or the last ciphered block), else None
+
+            return the ciphered blocks as a bytearray, and the last ciphered block
+        """
+        pack = self.block_struct.pack
+        ciphered_blocks = bytearray()
+        for block in blocks:
+            # handle CBC mode: xor with the IV or the previous ciphered block
+            if previous is not None:
+                block = Threefish.xor_with_block(block, previous)
+                previous = self.encrypt_block(block)
+                ciphered_blocks += pack(*previous)
+            else:
+                ciphered_blocks += pack(*self.encrypt_block(block))
+
+        return ciphered_blocks, previous
+
+    def decipher_blocks(self, blocks, previous=None):
+        """ Decipher a list of blocks
+
+            Args:
+                blocks -- iterable of list of int -- the blocks to decipher
+                previous -- list of int -- in CBC mode, the block to xor with
+                    the first deciphered block (the IV or the last ciphered block),
+                    else None
+
+            return the deciphered blocks as a bytearray, and the last ciphered block
+        """
+        pack = self.block_struct.pack
+        deciphered_blocks = bytearray()
+        for block in blocks:
+            deciphered_block = self.decrypt_block(block)
+            # handle CBC mode: xor with the IV or the previous ciphered block
+            if previous is not None:
+                deciphered_block = Threefish.xor_with_block(deciphered_block, previous)
+                previous = block
+            deciphered_blocks += pack(*deciphered_block)
+
+        return deciphered_blocks, previous
+
+    def use_batch(self, nb_blocks):
+        """ Check if the NumPy engine should be used
+
+            Args:
+                nb_blocks -- int -- the number of blocks to process
+
+            return True if ThreefishBatch is available and worth it
+        """
+        return (ThreefishBatch.available() and Threefish.BATCH_BLOCKS is not None
+                and nb_blocks >= Threefish.BATCH_BLOCKS)
+
+    def cipher_data(self, data, previous=None):
+        """ Cipher some complete blocks, with the NumPy engine for large
+            inputs in ECB mode, else with cipher_blocks
+
+            Args:
+                data -- bytes -- the blocks, the length is a multiple of the block size
+                previous -- list of int -- in CBC mode, the IV or the last
+                    ciphered block, else None
+
+            return the ciphered bytes, and the last ciphered block
+        """
+        if previous is None and self.use_batch(len(data) // self.block_size):
+            return ThreefishBatch(self).cipher(data), None
+        return self.cipher_blocks(iter_blocks(data, self.block_struct), previous)
+
+    def decipher_data(self, data, previous=None):
+        """ Decipher some complete blocks, with the NumPy engine for large
+            inputs, else with decipher_blocks
+
+            Args:
+                data -- bytes -- the blocks, the length is a multiple of the block size
+                previous -- list of int -- in CBC mode, the IV or the last
+                    ciphered block, else None
+
+            return the deciphered bytes, and the last ciphered block
+        """
+        if self.use_batch(len(data) // self.block_size):
+            plaintext = ThreefishBatch(self).decipher(data, previous)
+            if previous is not None:
+                previous = self.blockify(data[-self.block_size:], self.block_size)[0]
+            return plaintext, previous
+        return self.decipher_blocks(iter_blocks(data, self.block_struct), previous)
+
+    def encryptor(self, IV=None):
+        """ Create an object to cipher a stream chunk by chunk
+
+            Args:
+                IV -- bytes -- the initialization vector if case of CBC cipher mode
+
+            return a ThreefishEncryptor
+        """
+        return ThreefishEncryptor(self, IV)
+
+    def decryptor(self, IV=None):
+        """ Create an object to decipher a stream chunk by chunk
+
+            Args:
+                IV -- bytes -- the initialization vector if case of CBC cipher mode
+
+            return a ThreefishDecryptor
+        """
+        return ThreefishDecryptor(self, IV)
 
     def cipher(self, plaintext, IV=None):
         """
@@ -251,42 +569,8 @@ class Threefish(object):
 
             return the ciphered text as bytes
         """
-        # add padding to the plaintext
-        plaintext = bytes(add_padding(plaintext, block_size=self.block_size*8))
-        # cut the plaintext in blocks
-        blocks = self.blockify(plaintext, self.block_size)
-        # cut the IV in blocks
-        if IV:
-            IV = self.blockify(IV, self.block_size)[0]
-
-        ciphered_blocks = []
-        # Go through blocks
-        for i, block in enumerate(blocks):
-            # handle CBC mode
-            if IV:
-                # if it's the first block, xor with the IV
-                blocks[i] = Threefish.xor_with_block(block, IV if i == 0 else blocks[i-1])
-            # rounds
-            for j in range(Threefish.NB_ROUNDS-1):
-                # Apply one of the subkey every 4 rounds
-                if j % 4 == 0:
-                    key = self.rounds_keys[j//4]
-                    block = Threefish.xor_with_block(block, key)
-                block = Threefish.threefish_round(block)
-
-            key = self.rounds_keys[-1]
-            block = Threefish.xor_with_block(block, key)
-            block = Threefish.threefish_round(block)
-
-            ciphered_blocks.append(block)
-            blocks[i] = block
-
-        # join all the words
-        ciphertext = b''
-        for i in range(len(ciphered_blocks)):
-            for j in range(len(ciphered_blocks[i])):
-                ciphertext += ciphered_blocks[i][j]
-        return ciphertext
+        encryptor = self.encryptor(IV)
+        return b''.join((encryptor.update(plaintext), encryptor.finalize()))
 
     def decipher(self, ciphertext, IV=None):
         """
@@ -294,48 +578,367 @@ class Threefish(object):
 
             Args:
                 ciphertext -- bytes -- the text to decipher
+                IV -- bytes -- the initialization vector if case of CBC cipher mode
+
+            return the deciphered text
+        """
+        decryptor = self.decryptor(IV)
+        return b''.join((decryptor.update(ciphertext), decryptor.finalize()))
+
+    def cipher_parallel(self, plaintext, workers=None, shard_blocks=None):
+        """ Cipher the text in ECB mode, using many processes
+
+            The padded plaintext is cut in contiguous shards of blocks, ciphered
+            by a pool of processes. The rounds keys are sent once to each process.
+
+            Args:
+                plaintext -- bytes -- the text to cipher
+                workers -- int -- the number of processes, None for the number of cores
+                shard_blocks -- int -- the number of blocks in a shard
+
+            return the ciphered text as bytes
+        """
+        shard_size = (shard_blocks or Threefish.SHARD_BLOCKS) * self.block_size
+        plaintext = add_padding(plaintext, block_size=self.block_size*8)
+        shards = split_in_shards(plaintext, shard_size)
+        return b''.join(run_in_processes(_cipher_shard, shards, Threefish.from_rounds_keys,
+                                         (self.block_size, self.rounds_keys), workers, self))
+
+    def decipher_parallel(self, ciphertext, IV=None, workers=None, shard_blocks=None):
+        """ Decipher the text in ECB or CBC mode, using many processes
+
+            In CBC mode, each shard is sent with the ciphered block which
+            precedes it (or the IV for the first one).
+
+            Args:
+                ciphertext -- bytes -- the text to decipher
+                IV -- bytes -- the initialization vector if case of CBC cipher mode
+                workers -- int -- the number of processes, None for the number of cores
+                shard_blocks -- int -- the number of blocks in a shard
 
             return the deciphered text
         """
-        # cut the ciphertext in blocks
-        ciphered_blocks = self.blockify(ciphertext, self.block_size)
-        # cut the IV in blocks
+        if len(ciphertext) % self.block_size != 0:
+            raise ValueError("the ciphertext length is not a multiple of the block size")
+        shard_size = (shard_blocks or Threefish.SHARD_BLOCKS) * self.block_size
+        shards = split_in_shards(ciphertext, shard_size)
         if IV:
-            IV = self.blockify(IV, self.block_size)[0]
-
-        blocks = [None]*(len(ciphered_blocks))
-        # loop through ciphered blocks
-        for i, ciphered_block in reversed(list(enumerate(ciphered_blocks))):
-
-            ciphered_block = self.threefish_round_inv(ciphered_block)
-            key = self.rounds_keys[-1]
-            ciphered_block = Threefish.xor_with_block(ciphered_block, key)
-
-            # rounds
-            for j in range(self.NB_ROUNDS-2, -1, -1):
-                # Invert the round
-                ciphered_block = self.threefish_round_inv(ciphered_block)
-                # Apply one of the subkey every 4 rounds
-                if j % 4 == 0:
-                    key = self.rounds_keys[j//4]
-                    ciphered_block = Threefish.xor_with_block(ciphered_block, key)
-            # handle CBC mode
-            if IV:
-                # if it's the first block, xor with the IV
-                ciphered_block = Threefish.xor_with_block(ciphered_block,
-                                                          IV if i == 0 else ciphered_blocks[i-1])
-
-            ciphered_blocks[i] = ciphered_block
-            blocks[i] = ciphered_blocks[i]
-
-        # join all words
-        plaintext = b''
-        for i in range(len(blocks)):
-            for j in range(len(blocks[i])):
-                plaintext += blocks[i][j]
+            previous = [IV[:self.block_size]] + [shard[-self.block_size:] for shard in shards[:-1]]
+        else:
+            previous = [None] * len(shards)
+        plaintext = b''.join(run_in_processes(_decipher_shard, list(zip(shards, previous)),
+                                              Threefish.from_rounds_keys,
+                                              (self.block_size, self.rounds_keys), workers, self))
 
         # remove padding
         padding_size = int.from_bytes(plaintext[-2:], byteorder="big")
+        return plaintext[:len(plaintext) - padding_size]
+
+    def cipher_file_mmap(self, input_path, output_path, IV=None, workers=1,
+                         region_size=None):
+        """ Cipher a file into another one, both memory-mapped
+
+            The output file is created with its final size, then each region
+            of the input is ciphered straight into the same region of the output.
+            The OS loads and writes back the pages, so the file can be larger
+            than the memory. In ECB mode the regions are independent, so they
+            can be ciphered by many processes.
+
+            Args:
+                input_path -- string -- the file to cipher
+                output_path -- string -- the file to create
+                IV -- bytes -- the initialization vector if case of CBC cipher mode
+                workers -- int -- the number of processes (ECB only), None for the
+                    number of cores
+                region_size -- int -- the size of a region, in bytes
+        """
+        size = os.path.getsize(input_path)
+        full = size - size % self.block_size
+        with open(input_path, 'rb') as f_in:
+            f_in.seek(full)
+            tail = add_padding(f_in.read(), block_size=self.block_size*8)
+        with open(output_path, 'wb') as f_out:
+            f_out.truncate(full + len(tail))
+
+        previous = self.blockify(IV, self.block_size)[0] if IV else None
+        regions = self._mmap_regions(input_path, output_path, 0, full, region_size)
+        if previous is None:
+            run_in_processes(_cipher_region, regions, Threefish.from_rounds_keys,
+                             (self.block_size, self.rounds_keys), workers, self)
+        else:
+            # CBC: each region needs the last ciphered block of the previous one
+            for region in regions:
+                previous = _map_region(self.cipher_data, region, previous)
+
+        with open(output_path, 'r+b') as f_out:
+            f_out.seek(full)
+            f_out.write(self.cipher_data(tail, previous)[0])
+
+    def decipher_file_mmap(self, input_path, output_path, IV=None, workers=1,
+                           region_size=None):
+        """ Decipher a file into another one, both memory-mapped
+
+            The 2 last blocks (which contain the padding) are deciphered first,
+            to know the size of the output file. Then, each region of the input
+            is deciphered straight into the output, by many processes if needed
+            (in ECB and CBC mode).
+
+            Args:
+                input_path -- string -- the file to decipher
+                output_path -- string -- the file to create
+                IV -- bytes -- the initialization vector if case of CBC cipher mode
+                workers -- int -- the number of processes, None for the number of cores
+                region_size -- int -- the size of a region, in bytes
+        """
+        size = os.path.getsize(input_path)
+        if size == 0 or size % self.block_size != 0:
+            raise ValueError("the ciphertext length is not a multiple of the block size")
+        # the 2 last blocks may contain the padding
+        end = max(0, size - 2*self.block_size)
+        with open(input_path, 'rb') as f_in:
+            f_in.seek(max(0, end - self.block_size))
+            previous = f_in.read(end - f_in.tell())
+            last_blocks = f_in.read()
+        if IV:
+            # CBC: the last blocks are xored with the ciphered block which precedes them
+            previous = self.blockify(previous or IV, self.block_size)[0]
+        else:
+            previous = None
+        plaintext = self.decipher_data(last_blocks, previous)[0]
+        padding_size = int.from_bytes(plaintext[-2:], byteorder="big")
         plaintext = plaintext[:len(plaintext) - padding_size]
 
-        return plaintext
+        with open(output_path, 'wb') as f_out:
+            f_out.truncate(end + len(plaintext))
+            f_out.seek(end)
+            f_out.write(plaintext)
+
+        regions = self._mmap_regions(input_path, output_path, 0, end, region_size)
+        if IV:
+            # CBC: each region is sent with the ciphered block which precedes it
+            with open(input_path, 'rb') as f_in:
+                for i, region in enumerate(regions):
+                    previous = IV[:self.block_size]
+                    if i > 0:
+                        f_in.seek(region[2] - self.block_size)
+                        previous = f_in.read(self.block_size)
+                    regions[i] += (previous,)
+        run_in_processes(_decipher_region, regions, Threefish.from_rounds_keys,
+                         (self.block_size, self.rounds_keys), workers, self)
+
+    def _mmap_regions(self, input_path, output_path, start, end, region_size=None):
+        """ Cut a part of a file in regions to memory-map
+
+            Args:
+                input_path -- string -- the input file
+                output_path -- string -- the output file
+                start -- int -- the offset of the first region (page aligned)
+                end -- int -- the end of the last region
+                region_size -- int -- the size of a region, rounded to a multiple
+                    of the page size
+
+            return a list of tuples (input_path, output_path, offset, length)
+        """
+        granularity = mmap.ALLOCATIONGRANULARITY
+        region_size = region_size or Threefish.MMAP_REGION
+        region_size = max(granularity, region_size - region_size % granularity)
+        return [(input_path, output_path, offset, min(region_size, end - offset))
+                for offset in range(start, end, region_size)]
+
+    def cipher_file(self, f_in, f_out, IV=None):
+        """ Cipher a file chunk by chunk, the memory used doesn't depend
+            on the size of the file
+
+            Args:
+                f_in -- file object -- the file to cipher, opened in 'rb' mode
+                f_out -- file object -- where to write the ciphertext, opened in 'wb' mode
+                IV -- bytes -- the initialization vector if case of CBC cipher mode
+        """
+        run_file(self.encryptor(IV), f_in, f_out, self.CHUNK_SIZE)
+
+    def decipher_file(self, f_in, f_out, IV=None):
+        """ Decipher a file chunk by chunk, the memory used doesn't depend
+            on the size of the file
+
+            Args:
+                f_in -- file object -- the file to decipher, opened in 'rb' mode
+                f_out -- file object -- where to write the plaintext, opened in 'wb' mode
+                IV -- bytes -- the initialization vector if case of CBC cipher mode
+        """
+        run_file(self.decryptor(IV), f_in, f_out, self.CHUNK_SIZE)
+
+Threefish.SCHEDULE_CACHE = KeyScheduleCache()
+
+class ThreefishEncryptor(object):
+    """ Cipher a stream with Threefish, chunk by chunk
+
+        Only the bytes of the last incomplete block are kept between 2 calls
+        to update. The padding is added by finalize.
+
+        Attributes:
+            threefish -- Threefish -- the instance used to cipher the blocks
+            previous -- list of int -- in CBC mode, the last ciphered block, else None
+            buffer -- bytearray -- the bytes waiting for a complete block
+                (less than a block)
+    """
+
+    def __init__(self, threefish, IV=None):
+        """
+            Args:
+                threefish -- Threefish -- instance with its rounds keys generated
+                IV -- bytes -- the initialization vector if case of CBC cipher mode
+        """
+        self.threefish = threefish
+        self.previous = threefish.blockify(IV, threefish.block_size)[0] if IV else None
+        self.buffer = bytearray()
+
+    def update(self, chunk):
+        """ Cipher all the complete blocks available
+
+            Args:
+                chunk -- bytes -- the next part of the plaintext
+
+            return the ciphered bytes
+        """
+        pieces, self.buffer = cut_blocks(self.buffer, chunk, self.threefish.block_size)
+        ciphertext = []
+        for piece in pieces:
+            ciphered, self.previous = self.threefish.cipher_data(piece, self.previous)
+            ciphertext.append(ciphered)
+        return ciphertext[0] if len(ciphertext) == 1 else b''.join(ciphertext)
+
+    def finalize(self):
+        """ Add the padding to the remaining bytes and cipher them
+
+            return the last ciphered bytes
+        """
+        block_size = self.threefish.block_size
+        padded = add_padding(self.buffer, block_size=block_size*8)
+        ciphertext, self.previous = self.threefish.cipher_data(padded, self.previous)
+        self.buffer = bytearray()
+        return ciphertext
+
+class ThreefishDecryptor(object):
+    """ Decipher a stream with Threefish, chunk by chunk
+
+        The 2 last complete blocks are kept between 2 calls to update, because
+        they may contain the padding, which is removed by finalize.
+
+        Attributes:
+            threefish -- Threefish -- the instance used to decipher the blocks
+            previous -- list of int -- in CBC mode, the last ciphered block, else None
+            buffer -- bytearray -- the bytes not deciphered yet (less than 3 blocks)
+    """
+
+    def __init__(self, threefish, IV=None):
+        """
+            Args:
+                threefish -- Threefish -- instance with its rounds keys generated
+                IV -- bytes -- the initialization vector if case of CBC cipher mode
+        """
+        self.threefish = threefish
+        self.previous = threefish.blockify(IV, threefish.block_size)[0] if IV else None
+        self.buffer = bytearray()
+
+    def update(self, chunk):
+        """ Decipher the complete blocks available, except the 2 last ones
+
+            Args:
+                chunk -- bytes -- the next part of the ciphertext
+
+            return the deciphered bytes
+        """
+        # keep the 2 last blocks back, they may contain the padding
+        pieces, self.buffer = cut_blocks(self.buffer, chunk, self.threefish.block_size,
+                                         hold_back=2)
+        plaintext = []
+        for piece in pieces:
+            deciphered, self.previous = self.threefish.decipher_data(piece, self.previous)
+            plaintext.append(deciphered)
+        return plaintext[0] if len(plaintext) == 1 else b''.join(plaintext)
+
+    def finalize(self):
+        """ Decipher the last blocks and remove the padding
+
+            return the last deciphered bytes
+        """
+        block_size = self.threefish.block_size
+        if not self.buffer:
+            return b''
+        if len(self.buffer) % block_size != 0:
+            raise ValueError("the ciphertext length is not a multiple of the block size")
+        plaintext, self.previous = self.threefish.decipher_data(self.buffer, self.previous)
+        self.buffer = bytearray()
+
+        # remove padding
+        padding_size = int.from_bytes(plaintext[-2:], byteorder="big")
+        return plaintext[:len(plaintext) - padding_size]
+
+def _cipher_shard(threefish, shard):
+    """ Cipher a shard of blocks in ECB mode
+
+        Args:
+            threefish -- Threefish -- the instance of the process
+            shard -- bytes -- the blocks to cipher
+
+        return the ciphered bytes
+    """
+    return threefish.cipher_data(shard)[0]
+
+def _decipher_shard(threefish, task):
+    """ Decipher a shard of blocks
+
+        Args:
+            threefish -- Threefish -- the instance of the process
+            task -- tuple -- the blocks to decipher, and the ciphered block which
+                precedes them in CBC mode (None in ECB mode)
+
+        return the deciphered bytes
+    """
+    shard, previous = task
+    if previous is not None:
+        previous = threefish.blockify(previous, threefish.block_size)[0]
+    return threefish.decipher_data(shard, previous)[0]
+
+def _map_region(process, region, previous=None):
+    """ Memory-map a region of the input and output files, and process
+        the input straight into the output
+
+        Args:
+            process -- function -- cipher_data or decipher_data
+            region -- tuple -- input path, output path, offset and length of the region
+            previous -- list of int -- in CBC mode, the block which precedes the region
+
+        return the last ciphered block, in CBC mode
+    """
+    input_path, output_path, offset, length = region[:4]
+    with open(input_path, 'rb') as f_in, open(output_path, 'r+b') as f_out:
+        with mmap.mmap(f_in.fileno(), length, access=mmap.ACCESS_READ,
+                       offset=offset) as in_map, \
+             mmap.mmap(f_out.fileno(), length, offset=offset) as out_map:
+            with memoryview(in_map) as view:
+                data, previous = process(view, previous)
+            out_map[:] = data
+    return previous
+
+def _cipher_region(threefish, region):
+    """ Cipher a region of a file in ECB mode
+
+        Args:
+            threefish -- Threefish -- the instance of the process
+            region -- tuple -- input path, output path, offset and length of the region
+    """
+    _map_region(threefish.cipher_data, region)
+
+def _decipher_region(threefish, region):
+    """ Decipher a region of a file
+
+        Args:
+            threefish -- Threefish -- the instance of the process
+            region -- tuple -- input path, output path, offset and length of the region,
+                and the ciphered block which precedes it in CBC mode
+    """
+    previous = None
+    if len(region) > 4:
+        previous = threefish.blockify(region[4], threefish.block_size)[0]
+    _map_region(threefish.decipher_data, region, previous)
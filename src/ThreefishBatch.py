@@ -0,0 +1,177 @@
+#!/usr/bin/env python3
+
+""" This module contains the ThreefishBatch class
+
+    NumPy is optional: if it's not installed, ThreefishBatch.available()
+    returns False and Threefish only uses its scalar engine.
+"""
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+class ThreefishBatch(object):
+    """ Threefish engine working on many blocks at once
+
+        The blocks are stored in a (N, words) uint64 NumPy array. Each step of
+        a round (mix, permutation, subkey injection) is done on the whole array,
+        so the Python overhead is paid once per round instead of once per block.
+
+        Attributes:
+            words -- int -- the number of 64 bits words in a block
+            rounds_keys -- numpy array -- the 20 rounds keys, shape (20, words)
+            permutation -- numpy array -- the permutation table
+            inverse_permutation -- numpy array -- the inverted permutation table
+            nb_rounds -- int -- the number of rounds
+            rotations -- numpy uint64 -- the number of rotations in the mix function
+    """
+
+    def __init__(self, threefish):
+        """
+            Args:
+                threefish -- Threefish -- instance with its rounds keys generated
+        """
+        self.words = threefish.block_size // threefish.W_LEN
+        self.rounds_keys = np.array(threefish.rounds_keys, dtype=np.uint64)
+        self.permutation = np.array(threefish.P[:self.words])
+        self.inverse_permutation = np.argsort(self.permutation)
+        self.nb_rounds = threefish.NB_ROUNDS
+        self.rotations = np.uint64(threefish.NB_ROTATIONS)
+
+    @staticmethod
+    def available():
+        """ return True if NumPy is installed
+        """
+        return np is not None
+
+    def load(self, data):
+        """ Cut the data in blocks of 64 bits words
+
+            Args:
+                data -- bytes -- the blocks, the length is a multiple of the block size
+
+            return a (N, words) uint64 array
+        """
+        return np.frombuffer(data, dtype='>u8').reshape(-1, self.words).astype(np.uint64)
+
+    @staticmethod
+    def emit(blocks):
+        """ Convert the blocks to bytes
+
+            Args:
+                blocks -- numpy array -- (N, words) uint64 array
+
+            return bytes
+        """
+        return blocks.astype('>u8').tobytes()
+
+    def threefish_round(self, blocks):
+        """ Mix each pair of words of all the blocks, then permute them
+
+            Args:
+                blocks -- numpy array -- (N, words) uint64 array
+
+            return the blocks after the round
+        """
+        m1 = blocks[:, 0::2]
+        m2 = blocks[:, 1::2]
+        mixed = np.empty_like(blocks)
+        mixed[:, 0::2] = m1 + m2
+        mixed[:, 1::2] = mixed[:, 0::2] ^ ((m2 << self.rotations)
+                                           | (m2 >> (np.uint64(64) - self.rotations)))
+        return mixed[:, self.permutation]
+
+    def threefish_round_inv(self, blocks):
+        """ Invert the permutation, then the mix of each pair of words
+
+            Args:
+                blocks -- numpy array -- (N, words) uint64 array
+
+            return the blocks after the inverted round
+        """
+        blocks = blocks[:, self.inverse_permutation]
+        m1 = blocks[:, 0::2]
+        temp_m2 = m1 ^ blocks[:, 1::2]
+        unmixed = np.empty_like(blocks)
+        unmixed[:, 1::2] = ((temp_m2 >> self.rotations)
+                            | (temp_m2 << (np.uint64(64) - self.rotations)))
+        unmixed[:, 0::2] = m1 - unmixed[:, 1::2]
+        return unmixed
+
+    def encrypt_blocks(self, blocks):
+        """ Run the rounds on all the blocks
+
+            Args:
+                blocks -- numpy array -- (N, words) uint64 array
+
+            return the ciphered blocks
+        """
+        for j in range(self.nb_rounds-1):
+            # Apply one of the subkey every 4 rounds
+            if j % 4 == 0:
+                blocks = blocks ^ self.rounds_keys[j//4]
+            blocks = self.threefish_round(blocks)
+
+        blocks = blocks ^ self.rounds_keys[-1]
+        return self.threefish_round(blocks)
+
+    def decrypt_blocks(self, blocks):
+        """ Invert the rounds on all the blocks
+
+            Args:
+                blocks -- numpy array -- (N, words) uint64 array
+
+            return the deciphered blocks
+        """
+        blocks = self.threefish_round_inv(blocks)
+        blocks = blocks ^ self.rounds_keys[-1]
+        for j in range(self.nb_rounds-2, -1, -1):
+            blocks = self.threefish_round_inv(blocks)
+            # Apply one of the subkey every 4 rounds
+            if j % 4 == 0:
+                blocks = blocks ^ self.rounds_keys[j//4]
+        return blocks
+
+    def cipher(self, data):
+        """ Cipher some blocks in ECB mode
+
+            Args:
+                data -- bytes -- the blocks, the length is a multiple of the block size
+
+            return the ciphered bytes
+        """
+        return self.emit(self.encrypt_blocks(self.load(data)))
+
+    def decipher(self, data, previous=None):
+        """ Decipher some blocks in ECB or CBC mode
+
+            Args:
+                data -- bytes -- the blocks, the length is a multiple of the block size
+                previous -- list of int -- in CBC mode, the block which precedes
+                    the data (the IV or the last ciphered block), else None
+
+            return the deciphered bytes
+        """
+        ciphered = self.load(data)
+        blocks = self.decrypt_blocks(ciphered)
+        if previous is not None:
+            # each block is xored with the ciphered block which precedes it
+            blocks[0] ^= np.array(previous, dtype=np.uint64)
+            blocks[1:] ^= ciphered[:-1]
+        return self.emit(blocks)
+
+    def keystream(self, nonce_words, first_block, nb_blocks):
+        """ Generate blocks of keystream for the counter mode
+
+            Args:
+                nonce_words -- list of int -- the first words of the counter blocks
+                first_block -- int -- the counter of the first block
+                nb_blocks -- int -- the number of blocks to generate
+
+            return the keystream as bytes
+        """
+        blocks = np.empty((nb_blocks, self.words), dtype=np.uint64)
+        blocks[:, :-1] = np.array(nonce_words, dtype=np.uint64)
+        blocks[:, -1] = np.arange(nb_blocks, dtype=np.uint64) + np.uint64(first_block)
+        return self.emit(self.encrypt_blocks(blocks))
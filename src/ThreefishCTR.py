@@ -0,0 +1,147 @@
+#!/usr/bin/env python3
+
+""" This module contains the ThreefishCTR class
+"""
+
+from src.Threefish import Threefish
+from src.ThreefishBatch import ThreefishBatch
+from src import _backends
+from src._parallel import run_in_processes
+
+class ThreefishCTR(object):
+    """ Counter (CTR) mode for Threefish
+
+        The keystream is made of the blocks nonce||counter ciphered with Threefish,
+        where the counter is the index of the block in the stream (last word of the
+        block). There is no padding, and each block of keystream can be generated
+        independently: any byte range can be ciphered/deciphered alone, and the
+        keystream can be generated by many processes.
+
+        Attributes:
+            threefish -- Threefish -- instance with its rounds keys generated
+            nonce -- bytes -- block_size - 8 bytes, the first words of the counter blocks
+            nonce_words -- list of int -- the nonce cut in 64 bits words
+    """
+
+    def __init__(self, threefish, nonce):
+        """
+            Args:
+                threefish -- Threefish -- instance with its rounds keys generated
+                nonce -- bytes -- must have a length of block_size - 8
+                    (the last word of the counter block is the counter)
+        """
+        if len(nonce) != threefish.block_size - Threefish.W_LEN:
+            raise ValueError("the nonce must have a length of %d bytes"
+                             % (threefish.block_size - Threefish.W_LEN))
+        self.threefish = threefish
+        self.nonce = bytes(nonce)
+        self.nonce_words = list(Threefish.blockify(self.nonce + bytes(Threefish.W_LEN),
+                                                   threefish.block_size)[0][:-1])
+
+    def keystream_blocks(self, first_block, nb_blocks):
+        """ Generate some consecutive blocks of keystream,
+            with the NumPy engine if there are enough blocks
+
+            Args:
+                first_block -- int -- the counter of the first block
+                nb_blocks -- int -- the number of blocks to generate
+
+            return the keystream as bytes
+        """
+        if self.threefish.use_batch(nb_blocks):
+            return ThreefishBatch(self.threefish).keystream(
+                self.nonce_words, first_block & Threefish.MASK, nb_blocks)
+
+        pack = self.threefish.block_struct.pack
+        encrypt_block = self.threefish.encrypt_block
+        nonce_words = self.nonce_words
+        return b''.join([pack(*encrypt_block(nonce_words + [counter & Threefish.MASK]))
+                         for counter in range(first_block, first_block + nb_blocks)])
+
+    def keystream(self, offset, length, workers=1, shard_blocks=None):
+        """ Generate the keystream for the given byte range
+
+            Args:
+                offset -- int -- the position of the first byte in the stream
+                length -- int -- the number of bytes to generate
+                workers -- int -- the number of processes, None for the number of cores
+                shard_blocks -- int -- the number of blocks generated by a process at once
+
+            return the keystream as bytes
+        """
+        if length <= 0:
+            return b''
+        block_size = self.threefish.block_size
+        first_block = offset // block_size
+        nb_blocks = (offset + length - 1) // block_size - first_block + 1
+        shard_blocks = shard_blocks or Threefish.SHARD_BLOCKS
+
+        if workers == 1:
+            keystream = self.keystream_blocks(first_block, nb_blocks)
+        else:
+            tasks = [(counter, min(shard_blocks, first_block + nb_blocks - counter))
+                     for counter in range(first_block, first_block + nb_blocks, shard_blocks)]
+            keystream = b''.join(run_in_processes(
+                _keystream_shard, tasks, _init_worker,
+                (block_size, self.threefish.rounds_keys, self.nonce), workers, self))
+
+        start = offset % block_size
+        return keystream[start:start + length]
+
+    def cipher(self, data, offset=0, workers=1, shard_blocks=None):
+        """ Cipher (or decipher, it's the same operation) some data
+
+            Args:
+                data -- bytes -- the data to cipher
+                offset -- int -- the position of data in the whole stream
+                workers -- int -- the number of processes, None for the number of cores
+                shard_blocks -- int -- the number of blocks generated by a process at once
+
+            return the ciphered data as bytes
+        """
+        keystream = self.keystream(offset, len(data), workers, shard_blocks)
+        return _backends.get('xor')(data, keystream)
+
+    decipher = cipher
+
+    def decrypt_range(self, source, offset, length, workers=1):
+        """ Decipher only a part of a ciphertext
+
+            Args:
+                source -- bytes or file object -- the whole ciphertext, or a
+                    seekable file opened in 'rb' mode: only the range is read
+                offset -- int -- the position of the first byte to decipher
+                length -- int -- the number of bytes to decipher
+                workers -- int -- the number of processes, None for the number of cores
+
+            return the deciphered bytes
+        """
+        if hasattr(source, 'seek'):
+            source.seek(offset)
+            data = source.read(length)
+        else:
+            data = source[offset:offset + length]
+        return self.cipher(data, offset, workers)
+
+def _init_worker(block_size, rounds_keys, nonce):
+    """ Create the ThreefishCTR instance of a process
+
+        Args:
+            block_size -- integer -- the size of a block, in bytes
+            rounds_keys -- list of list of int -- the 20 rounds keys
+            nonce -- bytes -- the nonce
+
+        return the ThreefishCTR instance
+    """
+    return ThreefishCTR(Threefish.from_rounds_keys(block_size, rounds_keys), nonce)
+
+def _keystream_shard(ctr, task):
+    """ Generate a shard of keystream
+
+        Args:
+            ctr -- ThreefishCTR -- the instance of the process
+            task -- tuple -- the counter of the first block, and the number of blocks
+
+        return the keystream as bytes
+    """
+    return ctr.keystream_blocks(*task)
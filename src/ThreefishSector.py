@@ -0,0 +1,215 @@
+#!/usr/bin/env python3
+
+""" This module contains the ThreefishSector class
+"""
+
+from src.Threefish import Threefish
+from src._utils import iter_blocks
+from src._parallel import run_in_processes
+
+class ThreefishSector(object):
+    """ Sector mode for Threefish, to cipher disk images with random access
+
+        Threefish is a tweakable cipher: here the 2 tweaks of each block are
+        the index of its sector and its index in the sector. So every block of
+        the image is ciphered with its own tweaks: the sectors (and the blocks)
+        are independent, they can be read, written and ciphered in any order,
+        and by many processes. There is no padding: a sector is a multiple of
+        the block size.
+
+        The key schedule isn't run for each block: the rounds keys without the
+        tweaks are generated once, and the tweaks of each block are added to
+        them by the tweakable round functions, while the rounds run.
+
+        Attributes:
+            block_size -- int -- the size of a block, in bytes
+            key -- bytes -- the key (the tweaks of the user's key are not used),
+                None if the instance is created from the rounds keys
+            sector_size -- int -- the size of a sector, in bytes
+            threefish -- Threefish -- used to cipher/decipher the blocks
+            base_rounds_keys -- tuple of tuple of int -- the rounds keys, tweaks at 0
+            _encrypt, _decrypt -- function -- the tweakable round functions
+    """
+
+    def __init__(self, block_size, key, sector_size=4096):
+        """
+            Args:
+                block_size -- int -- 32, 64 or 128 -- the size of a block, in bytes
+                key -- bytes -- the key, same length as block_size
+                sector_size -- int -- the size of a sector, multiple of block_size
+        """
+        if sector_size % block_size != 0:
+            raise ValueError("the sector size must be a multiple of the block size")
+        self.block_size = block_size
+        self.key = bytes(key[:block_size])
+        self.sector_size = sector_size
+        self.threefish = Threefish(block_size, self.key + bytes(2*Threefish.W_LEN))
+        self.base_rounds_keys = Threefish.generate_rounds_keys(block_size, self.key, (0, 0, 0))
+        self._encrypt, self._decrypt = Threefish.generate_round_functions(
+            block_size // Threefish.W_LEN, tweakable=True)
+
+    @classmethod
+    def from_rounds_keys(cls, block_size, base_rounds_keys, sector_size=4096):
+        """ Create an instance from already generated rounds keys (tweaks at 0),
+            without the key: the key schedule isn't run again
+
+            Args:
+                block_size -- int -- 32, 64 or 128 -- the size of a block, in bytes
+                base_rounds_keys -- tuple of tuple of int -- the rounds keys, tweaks at 0
+                sector_size -- int -- the size of a sector, multiple of block_size
+
+            return a ThreefishSector instance, ready to cipher/decipher
+        """
+        sectors = cls.__new__(cls)
+        sectors.block_size = block_size
+        sectors.key = None
+        sectors.sector_size = sector_size
+        sectors.threefish = Threefish.from_rounds_keys(block_size, base_rounds_keys)
+        sectors.base_rounds_keys = base_rounds_keys
+        sectors._encrypt, sectors._decrypt = Threefish.generate_round_functions(
+            block_size // Threefish.W_LEN, tweakable=True)
+        return sectors
+
+    def rounds_keys(self, sector, block):
+        """ Generate the rounds keys of a block, from the rounds keys without tweaks
+            (the rounds of the sectors don't need them: the tweaks are added
+            while the rounds run)
+
+            Args:
+                sector -- int -- the index of the sector
+                block -- int -- the index of the block in the sector
+
+            return the rounds keys, as a tuple of tuple of int
+        """
+        tweaks = (sector & Threefish.MASK, block, (sector & Threefish.MASK) + block)
+        words = self.block_size // Threefish.W_LEN
+        return tuple(round_keys[:words-3]
+                     + ((round_keys[words-3] + tweaks[i % 3]) & Threefish.MASK,
+                        (round_keys[words-2] + tweaks[(i+1) % 3]) & Threefish.MASK,
+                        round_keys[words-1])
+                     for i, round_keys in enumerate(self.base_rounds_keys))
+
+    def _run_sector(self, process, sector, data):
+        """ Cipher or decipher the blocks of a sector
+
+            Args:
+                process -- function -- the tweakable round functions, _encrypt or _decrypt
+                sector -- int -- the index of the sector
+                data -- bytes -- the sector (multiple of the block size)
+
+            return the processed sector, as bytes
+        """
+        if len(data) % self.block_size != 0 or len(data) > self.sector_size:
+            raise ValueError("a sector must be a multiple of the block size")
+        pack = self.threefish.block_struct.pack
+        rounds_keys = self.base_rounds_keys
+        sector &= Threefish.MASK
+        return b''.join([pack(*process(block, rounds_keys, (sector, i, sector + i)))
+                         for i, block in enumerate(iter_blocks(data, self.threefish.block_struct))])
+
+    def cipher_sector(self, sector, data):
+        """ Cipher a sector
+
+            Args:
+                sector -- int -- the index of the sector
+                data -- bytes -- the plaintext of the sector
+
+            return the ciphered sector
+        """
+        return self._run_sector(self._encrypt, sector, data)
+
+    def decipher_sector(self, sector, data):
+        """ Decipher a sector
+
+            Args:
+                sector -- int -- the index of the sector
+                data -- bytes -- the ciphertext of the sector
+
+            return the deciphered sector
+        """
+        return self._run_sector(self._decrypt, sector, data)
+
+    def _run(self, decipher, data, first_sector, workers, shard_sectors):
+        """ Cipher or decipher consecutive sectors, by many processes if needed
+
+            return the processed sectors, as bytes
+        """
+        if workers == 1:
+            return _run_shard(self, (decipher, first_sector, data))
+        shard_size = shard_sectors * self.sector_size
+        tasks = [(decipher, first_sector + offset // self.sector_size,
+                  bytes(data[offset:offset + shard_size]))
+                 for offset in range(0, len(data), shard_size)]
+        return b''.join(run_in_processes(_run_shard, tasks, ThreefishSector.from_rounds_keys,
+                                         (self.block_size, self.base_rounds_keys,
+                                          self.sector_size),
+                                         workers, self))
+
+    def cipher(self, data, first_sector=0, workers=1, shard_sectors=64):
+        """ Cipher consecutive sectors
+
+            Args:
+                data -- bytes -- the sectors to cipher (the last one can be shorter)
+                first_sector -- int -- the index of the first sector
+                workers -- int -- the number of processes, None for the number of cores
+                shard_sectors -- int -- the number of sectors sent at once to a process
+
+            return the ciphered sectors
+        """
+        return self._run(False, data, first_sector, workers, shard_sectors)
+
+    def decipher(self, data, first_sector=0, workers=1, shard_sectors=64):
+        """ Decipher consecutive sectors
+
+            Args:
+                data -- bytes -- the sectors to decipher (the last one can be shorter)
+                first_sector -- int -- the index of the first sector
+                workers -- int -- the number of processes, None for the number of cores
+                shard_sectors -- int -- the number of sectors sent at once to a process
+
+            return the deciphered sectors
+        """
+        return self._run(True, data, first_sector, workers, shard_sectors)
+
+    def read_sectors(self, f, first_sector, count=1, workers=1):
+        """ Read and decipher some sectors of an image, without reading the others
+
+            Args:
+                f -- file object -- the ciphered image, seekable, opened in 'rb' mode
+                first_sector -- int -- the index of the first sector to read
+                count -- int -- the number of sectors to read
+                workers -- int -- the number of processes, None for the number of cores
+
+            return the deciphered sectors
+        """
+        f.seek(first_sector * self.sector_size)
+        return self.decipher(f.read(count * self.sector_size), first_sector, workers)
+
+    def write_sectors(self, f, first_sector, data, workers=1):
+        """ Cipher some sectors and write them in an image, at their position
+
+            Args:
+                f -- file object -- the ciphered image, seekable, opened in 'r+b' mode
+                first_sector -- int -- the index of the first sector to write
+                data -- bytes -- the plaintext of the sectors
+                workers -- int -- the number of processes, None for the number of cores
+        """
+        f.seek(first_sector * self.sector_size)
+        f.write(self.cipher(data, first_sector, workers))
+
+def _run_shard(sectors, task):
+    """ Cipher or decipher a shard of consecutive sectors
+
+        Args:
+            sectors -- ThreefishSector -- the instance of the process
+            task -- tuple -- True to decipher, the index of the first sector,
+                and the sectors
+
+        return the processed sectors, as bytes
+    """
+    decipher, first_sector, data = task
+    sector_size = sectors.sector_size
+    process = sectors.decipher_sector if decipher else sectors.cipher_sector
+    return b''.join([process(first_sector + offset // sector_size,
+                             data[offset:offset + sector_size])
+                     for offset in range(0, len(data), sector_size)])
@@ -0,0 +1,142 @@
+#!/usr/bin/env python3
+
+""" This module contains the TripleDES class
+"""
+
+from functools import lru_cache
+from src.DES import (DES, DESModes, DESNetwork, IP_TABLES, IPINV_TABLES, permute)
+
+@lru_cache(maxsize=128)
+def des_for_key(key):
+    """ Create the DES instance of a key, its subkeys are generated only once
+        and shared by all the TripleDES instances using this key
+
+        Args:
+            key -- int -- the 64 bits key
+
+        return a DES instance
+    """
+    return DES(key)
+
+class TripleDES(DESModes):
+    """ Triple DES (EDE): cipher with K1, decipher with K2, cipher with K3
+
+        With 2 keys, K3 is K1. The modes (ECB, CBC, CTR), the streams and the
+        files are the ones of DES (DESModes): only the block functions differ.
+
+        A block isn't ciphered by 3 DES one after the other: IP-1 at the end of
+        a stage and IP at the start of the next one cancel out, so they are
+        skipped, and the 48 rounds run between a single IP and a single IP-1.
+
+        Attributes:
+            rounds -- int -- number of festeil rounds
+            key -- tuple of int -- K1, K2 and K3 (64 bits each)
+            stages -- tuple of DES -- the DES instances of K1, K2 and K3
+            encrypt_stages -- tuple -- the subkeys pieces of the 3 stages, to cipher
+            decrypt_stages -- tuple -- the subkeys pieces of the 3 stages, to decipher
+    """
+
+    def __init__(self, key):
+        """
+            Args:
+                key -- bytes or tuple -- 16 bytes (K1, K2) or 24 bytes (K1, K2, K3),
+                    or a tuple of 2 or 3 keys (int or 8 bytes)
+        """
+        if isinstance(key, (bytes, bytearray)):
+            if len(key) not in (16, 24):
+                raise ValueError("a Triple DES key has 16 or 24 bytes")
+            key = [key[i:i+8] for i in range(0, len(key), 8)]
+        keys = [DES.to_int(k) for k in key]
+        if len(keys) not in (2, 3):
+            raise ValueError("Triple DES needs 2 or 3 keys")
+        if len(keys) == 2:
+            keys.append(keys[0])
+
+        self.rounds = 48
+        self.key = tuple(keys)
+        self.stages = tuple(des_for_key(k) for k in keys)
+        des1, des2, des3 = self.stages
+        self.encrypt_stages = (des1.subkeys_pieces, des2.inverse_pieces, des3.subkeys_pieces)
+        self.decrypt_stages = (des3.inverse_pieces, des2.subkeys_pieces, des1.inverse_pieces)
+
+    @staticmethod
+    def run_stages(block, stages):
+        """ Run IP, the rounds of the 3 stages, and IP-1 on a block
+
+            Args:
+                block -- int -- the 64 bits block
+                stages -- tuple -- the subkeys pieces of each stage
+
+            return the processed block, as int
+        """
+        block = permute(block, IP_TABLES)
+        left, right = block >> 32, block & 0xffffffff
+        for pieces in stages:
+            # the output of a stage, before IP-1, is the input of the next
+            # one after IP: the halves go directly to the next stage
+            left, right = DESNetwork.rounds(left, right, pieces)
+        return permute((left << 32) | right, IPINV_TABLES)
+
+    def encrypt_block(self, block):
+        """ Cipher a block (EDE)
+
+            Args:
+                block -- int -- the 64 bits block
+
+            return the ciphered block, as int
+        """
+        return self.run_stages(block, self.encrypt_stages)
+
+    def decrypt_block(self, block):
+        """ Decipher a block
+
+            Args:
+                block -- int -- the 64 bits block
+
+            return the deciphered block, as int
+        """
+        return self.run_stages(block, self.decrypt_stages)
+
+    def encrypt_blocks(self, blocks):
+        """ Cipher many blocks, one after the other
+
+            Args:
+                blocks -- sequence of int -- the 64 bits blocks
+
+            return the list of ciphered blocks
+        """
+        stages = self.encrypt_stages
+        return [self.run_stages(block, stages) for block in blocks]
+
+    def decrypt_blocks(self, blocks):
+        """ Decipher many blocks, one after the other
+
+            Args:
+                blocks -- sequence of int -- the 64 bits blocks
+
+            return the list of deciphered blocks
+        """
+        stages = self.decrypt_stages
+        return [self.run_stages(block, stages) for block in blocks]
+
+    def encrypt_batch(self, blocks):
+        """ Cipher many blocks at once with the bitsliced engines of the 3 keys
+
+            Args:
+                blocks -- sequence of int -- the 64 bits blocks
+
+            return the list of ciphered blocks
+        """
+        des1, des2, des3 = self.stages
+        return des3.encrypt_batch(des2.decrypt_batch(des1.encrypt_batch(blocks)))
+
+    def decrypt_batch(self, blocks):
+        """ Decipher many blocks at once with the bitsliced engines of the 3 keys
+
+            Args:
+                blocks -- sequence of int -- the 64 bits blocks
+
+            return the list of deciphered blocks
+        """
+        des1, des2, des3 = self.stages
+        return des1.decrypt_batch(des2.encrypt_batch(des3.decrypt_batch(blocks)))
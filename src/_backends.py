@@ -0,0 +1,150 @@
+#!/usr/bin/env python3
+
+""" This module contains the registry of the implementations (backends) of
+    the primitives
+
+    Each algorithm has a reference implementation (pure Python, in src) and
+    optional accelerated ones (standard library, NumPy, ..). At the first use
+    of an algorithm, the accelerated backends are compared with the reference
+    on some test inputs, and the first one which gives the same outputs is
+    selected. If none does, the reference is used.
+
+    Set the environment variable CRYPTOLOGY_BACKEND to 'reference' (or call
+    force_reference) to always use the reference implementations.
+"""
+
+import os
+import hashlib
+from src.SHA1 import SHA1
+from src._functions import bytearray_xor
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+ENV_VARIABLE = "CRYPTOLOGY_BACKEND"
+REFERENCE = "reference"
+
+# algorithm -> {'reference', 'accelerated', 'probe', 'selected', 'rejected'}
+_REGISTRY = {}
+# set by force_reference, overrides the environment variable
+_FORCE_REFERENCE = None
+
+def register(algorithm, reference, probe):
+    """ Declare an algorithm and its reference implementation
+
+        Args:
+            algorithm -- string -- the name of the algorithm
+            reference -- function -- the reference implementation
+            probe -- function -- called with an implementation, runs it on test
+                inputs and returns the outputs, to compare the implementations
+    """
+    _REGISTRY[algorithm] = {'reference': reference, 'accelerated': [], 'probe': probe,
+                            'selected': None, 'rejected': {}}
+
+def register_accelerated(algorithm, name, implementation):
+    """ Add an accelerated implementation of an algorithm
+
+        Args:
+            algorithm -- string -- the name of the algorithm, already registered
+            name -- string -- the name of the backend
+            implementation -- function -- same interface as the reference
+    """
+    _REGISTRY[algorithm]['accelerated'].append((name, implementation))
+    _REGISTRY[algorithm]['selected'] = None
+
+def force_reference(force=True):
+    """ Use only the reference implementations (or, with None, let the
+        environment variable decide), the backends are selected again
+
+        Args:
+            force -- boolean -- True to use the reference implementations
+    """
+    global _FORCE_REFERENCE
+    _FORCE_REFERENCE = force
+    for entry in _REGISTRY.values():
+        entry['selected'] = None
+
+def _reference_forced():
+    """ return True if the reference implementations must be used
+    """
+    if _FORCE_REFERENCE is not None:
+        return _FORCE_REFERENCE
+    return os.environ.get(ENV_VARIABLE, "").lower() == REFERENCE
+
+def select(algorithm):
+    """ Select the backend of an algorithm, the self-test is run only once
+
+        Args:
+            algorithm -- string -- the name of the algorithm
+
+        return the name of the backend and its implementation
+    """
+    entry = _REGISTRY[algorithm]
+    if entry['selected'] is None:
+        entry['selected'] = (REFERENCE, entry['reference'])
+        if not _reference_forced():
+            expected = entry['probe'](entry['reference'])
+            for name, implementation in entry['accelerated']:
+                try:
+                    outputs = entry['probe'](implementation)
+                except Exception as error:
+                    entry['rejected'][name] = repr(error)
+                    continue
+                if outputs == expected:
+                    entry['selected'] = (name, implementation)
+                    break
+                entry['rejected'][name] = "different outputs"
+    return entry['selected']
+
+def get(algorithm):
+    """ return the implementation selected for the algorithm
+    """
+    return select(algorithm)[1]
+
+def selected_backends():
+    """ Select the backends of all the algorithms
+
+        return algorithm -> name of the selected backend
+    """
+    return {algorithm: select(algorithm)[0] for algorithm in sorted(_REGISTRY)}
+
+def rejected_backends():
+    """ return algorithm -> backend -> why the self-test rejected it
+    """
+    return {algorithm: dict(entry['rejected'])
+            for algorithm, entry in sorted(_REGISTRY.items()) if entry['rejected']}
+
+# SHA1: a function creating a hash object (update, copy, digest, hexdigest)
+
+def _probe_sha1(new):
+    messages = [b"", b"abc", bytes(range(64)), bytes(range(256)) * 3]
+    outputs = [new(message).digest() for message in messages]
+    # incremental update and copy
+    h = new(b"common ")
+    other = h.copy()
+    h.update(b"first")
+    other.update(bytes(100))
+    return outputs + [h.hexdigest(), other.hexdigest()]
+
+register("sha1", SHA1, _probe_sha1)
+register_accelerated("sha1", "hashlib", hashlib.sha1)
+
+# xor: xor of 2 bytes-like objects, on the length of the shortest one, as bytes
+
+def _xor_reference(b1, b2):
+    return bytes(bytearray_xor(b1, b2))
+
+def _xor_numpy(b1, b2):
+    length = min(len(b1), len(b2))
+    return np.bitwise_xor(np.frombuffer(b1, dtype=np.uint8, count=length),
+                          np.frombuffer(b2, dtype=np.uint8, count=length)).tobytes()
+
+def _probe_xor(xor):
+    data = bytes(range(256)) * 5
+    return [xor(b"", b""), xor(data, data[::-1]), xor(data[:7], data), xor(data, data[3:])]
+
+register("xor", _xor_reference, _probe_xor)
+if np is not None:
+    register_accelerated("xor", "numpy", _xor_numpy)
@@ -32,12 +32,18 @@ def sha1_check():
     """
     print_option_header("check a text's sha-1 hash")
 
-    text = load_data(data_name="the text")
+    text = load_data(data_name="the text", open_file=True)
     true_hash = load_data(data_name="the real hash", to_string=True)
 
-    # hash the text
+    # hash the text, a file is read piece by piece
     SCREEN.addstr("Hashing your text...\n\n")
-    text_hash = SHA1().hash(text)
+    sha1 = SHA1()
+    if hasattr(text, 'read'):
+        with text:
+            sha1.update_file(text)
+    else:
+        sha1.update(text)
+    text_hash = sha1.hexdigest()
     # print the hash
     print_data(text_hash, "Here's the text's hash:")
 
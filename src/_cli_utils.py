@@ -3,6 +3,7 @@
 """ This module contains functions to simplify the cli building
 """
 
+import os
 import curses
 from src._utils import (read_file, write_file)
 
@@ -65,13 +66,15 @@ def ask_question(question, answers, default_answer):
             user_answer = default_answer
     return user_answer
 
-def load_data(data_name=None, to_string=False):
+def load_data(data_name=None, to_string=False, open_file=False):
     """ Ask the data to the user. He has to choose between:
             - paste his text in the console
             - paste the name of his file in the console
 
         Args:
             to_string -- boolean -- if True, the data as string, else bytes
+            open_file -- boolean -- if True and the user chooses a file, return
+                the file opened in 'rb' mode instead of its content
 
         return the data
     """
@@ -96,6 +99,8 @@ def load_data(data_name=None, to_string=False):
         print_instruction("Enter the name of your file:\n")
         curses.echo()
         filename = str(SCREEN.getstr())[2:-1]
+        if open_file:
+            return open(os.path.abspath("assets/" + filename), "rb")
         data = read_file(filename, read_bytes=True)
 
     return str(data)[2:-1] if to_string else data
@@ -0,0 +1,73 @@
+#!/usr/bin/env python3
+
+""" This module contains helper functions to spread some work on many processes
+"""
+
+from functools import partial
+from concurrent.futures import ProcessPoolExecutor
+
+def split_in_shards(data, shard_size):
+    """ Cut the data in contiguous shards
+
+        Args:
+            data -- bytes -- the data to cut
+            shard_size -- int -- the size of a shard, in bytes
+
+        return a list of bytes
+    """
+    view = memoryview(data)
+    return [bytes(view[i:i+shard_size]) for i in range(0, len(data), shard_size)]
+
+# instance created by the initializer in each process of the pool
+_WORKER_INSTANCE = None
+
+def _init_worker(initializer, initargs):
+    """ Create the instance of the current process
+    """
+    global _WORKER_INSTANCE
+    _WORKER_INSTANCE = initializer(*initargs)
+
+def _run_in_worker(func, task):
+    """ Run func with the instance of the current process
+    """
+    return func(_WORKER_INSTANCE, task)
+
+def run_in_processes(func, tasks, initializer=None, initargs=(), workers=None,
+                     instance=None):
+    """ Run func on each task in a pool of processes
+
+        The initializer is called once in each process: it's used to send the
+        data shared by all the tasks (rounds keys, ..) only once per process.
+        It returns the instance used by the tasks of the process, and func is
+        called with this instance and a task.
+
+        When the tasks are run in the current process (1 worker or 1 task),
+        the initializer isn't called: func gets the instance given by the
+        caller, so nothing global is written and many threads can run their
+        tasks at the same time, with different instances.
+
+        Args:
+            func -- function -- module level function, called with one task
+                (with the instance and one task if there is an initializer)
+            tasks -- list -- the arguments of each call
+            initializer -- function -- module level function, called when a
+                process starts, returns the instance of the process
+            initargs -- tuple -- the arguments of the initializer
+            workers -- int -- the number of processes, None for the number of cores
+            instance -- object -- the instance used when the tasks are run in
+                the current process (required with an initializer)
+
+        return the list of results, in the same order as the tasks
+    """
+    # not worth the cost of starting processes
+    if len(tasks) <= 1 or workers == 1:
+        if initializer:
+            return [func(instance, task) for task in tasks]
+        return [func(task) for task in tasks]
+
+    if initializer:
+        func = partial(_run_in_worker, func)
+        initializer, initargs = _init_worker, (initializer, initargs)
+    with ProcessPoolExecutor(max_workers=workers, initializer=initializer,
+                             initargs=initargs) as executor:
+        return list(executor.map(func, tasks))
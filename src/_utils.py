@@ -11,6 +11,72 @@ import random
 def bytearray_to_int(byte_array):
     return int.from_bytes(byte_array, byteorder='big', signed=False)
 
+def iter_blocks(buffer, block_struct):
+    """ Iterate over the complete blocks of a buffer, without copying it
+
+        Each block is unpacked in a tuple of words by block_struct, directly
+        from a memoryview on the buffer. The incomplete last block is ignored.
+
+        Args:
+            buffer -- bytes-like object -- the data to cut in blocks
+            block_struct -- struct.Struct -- the format of a block (words, endianness)
+
+        return an iterator of tuples of int
+    """
+    view = memoryview(buffer).cast('B')
+    return block_struct.iter_unpack(view[:len(view) - len(view) % block_struct.size])
+
+def cut_blocks(buffer, chunk, block_size, hold_back=0):
+    """ Cut the buffered bytes and a new chunk in complete blocks to process now,
+        and bytes to keep for later
+
+        The chunk isn't copied: its complete blocks are returned as a memoryview.
+        Only the bytes kept for later, and the block which joins the buffer with
+        the chunk, are copied.
+
+        Args:
+            buffer -- bytearray -- the bytes kept by the previous call
+            chunk -- bytes -- the new bytes
+            block_size -- int -- the size of a block, in bytes
+            hold_back -- int -- the number of complete blocks to always keep
+
+        return the list of pieces to process (length multiple of block_size),
+            and the new buffer
+    """
+    view = memoryview(chunk).cast('B')
+    total = len(buffer) + len(view)
+    keep = min(total, total % block_size + hold_back*block_size)
+    to_process = total - keep
+    if to_process == 0:
+        buffer += view
+        return [], buffer
+    if to_process <= len(buffer):
+        return [buffer[:to_process]], buffer[to_process:] + view
+
+    # complete the last buffered block with the first bytes of the chunk
+    fill = (-len(buffer)) % block_size
+    pieces = [buffer + view[:fill]] if buffer else []
+    to_process -= len(buffer) + fill
+    if to_process:
+        pieces.append(view[fill:fill + to_process])
+    return pieces, bytearray(view[fill + to_process:])
+
+def run_file(processor, f_in, f_out, chunk_size=65536):
+    """ Feed an encryptor/decryptor with a file, chunk by chunk, and write its output
+
+        Args:
+            processor -- object -- has update(chunk) and finalize() methods
+                (ThreefishEncryptor, DESDecryptor, ..)
+            f_in -- file object -- the input file
+            f_out -- file object -- the output file
+            chunk_size -- int -- the number of bytes read at once
+    """
+    chunk = f_in.read(chunk_size)
+    while chunk:
+        f_out.write(processor.update(chunk))
+        chunk = f_in.read(chunk_size)
+    f_out.write(processor.finalize())
+
 def read_file(filename, directory="assets", read_bytes=False):
     """ Read the content of the given asset
 
@@ -43,6 +109,9 @@ def add_padding(stream, block_size=1024):
     padding_size_bytes = math.ceil(msb_index / 8)
     # calculate the padding size
     padding_size = (block_size // 8) - (len(stream) % (block_size//8))
+    # not enough room for the padding size bytes: pad with one more block
+    if padding_size < padding_size_bytes:
+        padding_size += block_size // 8
     # add padding (random bytes)
     for _ in range(0, padding_size - padding_size_bytes):
         stream.append(random.randint(0, 255))
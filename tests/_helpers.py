@@ -0,0 +1,44 @@
+""" Helpers shared by the tests
+"""
+
+import threading
+
+from src.Threefish import Threefish
+
+def create_threefish(block_size, first=0):
+    """ Create a Threefish instance with its rounds keys generated
+
+        Args:
+            block_size -- int -- 32, 64 or 128 -- the size of a block, in bytes
+            first -- int -- the first byte of the key (the key is a range of bytes)
+
+        return the Threefish instance
+    """
+    threefish = Threefish(block_size, bytes(range(first, first + block_size + 16)))
+    threefish.key_schedule()
+    return threefish
+
+def assert_thread_safe(test, create, nb_threads=4, calls=25):
+    """ Run a check many times in some threads, each thread with its own
+        instance (its own key): the threads must not interfere
+
+        Args:
+            test -- unittest.TestCase -- the running test
+            create -- function -- called in each thread with the index of the
+                thread, returns the check: a function without arguments which
+                returns True if its output is right
+            nb_threads -- int -- the number of threads
+            calls -- int -- the number of calls of the check in each thread
+    """
+    errors = []
+    def run(index):
+        check = create(index)
+        for _ in range(calls):
+            if not check():
+                errors.append(index)
+    threads = [threading.Thread(target=run, args=(index,)) for index in range(nb_threads)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    test.assertEqual(errors, [])
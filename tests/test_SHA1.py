@@ -1,3 +1,6 @@
+import hashlib
+import io
+import json
 import unittest
 
 from src.SHA1 import SHA1
@@ -28,5 +31,76 @@ class TestSHA1(unittest.TestCase):
         h = "7c0a529d2e9e40f54944674b0de7e806fba33262"
         self.assertEqual(sha_1.hash(text), h)
 
+    def test_hashlib_lengths(self):
+        # the messages with a length multiple of 64 bytes are padded too
+        data = bytes(range(256)) * 2
+        for length in list(range(130)) + [192, 256, 512]:
+            self.assertEqual(SHA1().hash(data[:length]),
+                             hashlib.sha1(data[:length]).hexdigest())
+
+    def test_hash_twice(self):
+        sha_1 = SHA1()
+        self.assertEqual(sha_1.hash("Hello world !"), sha_1.hash("Hello world !"))
+
+    def test_update(self):
+        data = bytes(range(256)) * 10
+        for size in (1, 7, 63, 64, 65, 1000):
+            sha_1 = SHA1()
+            for i in range(0, len(data), size):
+                sha_1.update(data[i:i+size])
+            self.assertEqual(sha_1.digest(), hashlib.sha1(data).digest())
+
+    def test_copy(self):
+        sha_1 = SHA1(b"common beginning, ")
+        other = sha_1.copy()
+        sha_1.update(b"first end")
+        other.update(b"second end")
+        self.assertEqual(sha_1.hexdigest(),
+                         hashlib.sha1(b"common beginning, first end").hexdigest())
+        self.assertEqual(other.hexdigest(),
+                         hashlib.sha1(b"common beginning, second end").hexdigest())
+        # digest doesn't end the hash
+        sha_1.update(b"!")
+        self.assertEqual(sha_1.hexdigest(),
+                         hashlib.sha1(b"common beginning, first end!").hexdigest())
+
+    def test_update_file(self):
+        data = bytes(range(256)) * 1000
+        sha_1 = SHA1()
+        sha_1.update_file(io.BytesIO(data), chunk_size=1000)
+        self.assertEqual(sha_1.hexdigest(), hashlib.sha1(data).hexdigest())
+
+    def test_export_state(self):
+        data = bytes(range(256)) * 10
+        sha_1 = SHA1(data[:1000])
+        # resume from the JSON state, at the position saved in the state
+        state = json.loads(json.dumps(sha_1.export_state()))
+        resumed = SHA1.from_state(state)
+        resumed.update(data[state['length']:])
+        self.assertEqual(resumed.hexdigest(), hashlib.sha1(data).hexdigest())
+
+    def test_checkpoint(self):
+        data = bytes(range(256)) * 100
+        states = []
+        SHA1().update_file(io.BytesIO(data), chunk_size=1000, checkpoint=states.append)
+        # interrupted after 3 chunks
+        f = io.BytesIO(data)
+        f.seek(states[2]['length'])
+        sha_1 = SHA1.from_state(states[2])
+        sha_1.update_file(f)
+        self.assertEqual(sha_1.hexdigest(), hashlib.sha1(data).hexdigest())
+
+    def test_shared_prefix_state(self):
+        state = SHA1(b"a" * 100).export_state()
+        for end in (b"", b"b", b"c" * 100):
+            sha_1 = SHA1.from_state(state)
+            sha_1.update(end)
+            self.assertEqual(sha_1.hexdigest(), hashlib.sha1(b"a" * 100 + end).hexdigest())
+
+    def test_invalid_state(self):
+        state = SHA1(b"abc").export_state()
+        state['length'] = 4
+        self.assertRaises(ValueError, SHA1.from_state, state)
+
 if __name__ == '__main__':
     unittest.main()
@@ -0,0 +1,43 @@
+import os
+import unittest
+
+from src import _backends
+
+class TestBackends(unittest.TestCase):
+
+    def tearDown(self):
+        _backends.force_reference(None)
+        _backends._REGISTRY.pop("test", None)
+
+    def test_self_test(self):
+        _backends.register("test", lambda x: x * 2, lambda f: [f(1), f(5)])
+        _backends.register_accelerated("test", "wrong", lambda x: x + 2)
+        _backends.register_accelerated("test", "broken", lambda x: 1 // 0)
+        _backends.register_accelerated("test", "fast", lambda x: x << 1)
+        self.assertEqual(_backends.select("test")[0], "fast")
+        self.assertEqual(_backends.rejected_backends()["test"]["wrong"], "different outputs")
+        self.assertIn("ZeroDivisionError", _backends.rejected_backends()["test"]["broken"])
+
+    def test_force_reference(self):
+        _backends.force_reference()
+        self.assertEqual(set(_backends.selected_backends().values()), {_backends.REFERENCE})
+
+    def test_environment_variable(self):
+        os.environ[_backends.ENV_VARIABLE] = "reference"
+        try:
+            _backends.force_reference(None)
+            self.assertEqual(_backends.select("sha1")[0], _backends.REFERENCE)
+        finally:
+            del os.environ[_backends.ENV_VARIABLE]
+            _backends.force_reference(None)
+        self.assertEqual(_backends.select("sha1")[0], "hashlib")
+
+    def test_same_results(self):
+        for force in (True, False):
+            _backends.force_reference(force)
+            sha1 = _backends.get("sha1")(b"abc")
+            self.assertEqual(sha1.hexdigest(), "a9993e364706816aba3e25717850c26c9cd0d89d")
+            self.assertEqual(_backends.get("xor")(b"\x01\x02\x03", b"\x03\x02"), b"\x02\x00")
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,26 @@
+import unittest
+
+from benchmarks._bench import compare
+
+class TestBenchmarks(unittest.TestCase):
+
+    def setUp(self):
+        self.baseline = {'case': {'cipher_bytes_per_s': 1000.0, 'generate_s': 1.0}}
+
+    def test_no_regression(self):
+        results = {'case': {'cipher_bytes_per_s': 850.0, 'generate_s': 1.1},
+                   'new_case': {'cipher_bytes_per_s': 1.0}}
+        self.assertEqual(compare(results, self.baseline, 0.2), [])
+
+    def test_throughput_regression(self):
+        results = {'case': {'cipher_bytes_per_s': 700.0, 'generate_s': 1.0}}
+        self.assertEqual(compare(results, self.baseline, 0.2),
+                         [('case', 'cipher_bytes_per_s', 1000.0, 700.0)])
+
+    def test_duration_regression(self):
+        results = {'case': {'cipher_bytes_per_s': 1000.0, 'generate_s': 1.5}}
+        self.assertEqual(compare(results, self.baseline, 0.2),
+                         [('case', 'generate_s', 1.0, 1.5)])
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,87 @@
+import os
+import tempfile
+import unittest
+
+from src.CipherCache import CipherCache
+from src.RC4 import RC4
+from src.Threefish import Threefish
+from src.ThreefishCTR import ThreefishCTR
+
+class TestCipherCache(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.cache = CipherCache(self.directory.name, max_size=1000)
+        self.calls = 0
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def cipher(self, data):
+        self.calls += 1
+        return RC4("key").cipher(data)
+
+    def test_hit(self):
+        first = self.cache.cached("rc4", {}, "key", "Hello world !", self.cipher)
+        second = self.cache.cached("rc4", {}, "key", "Hello world !", self.cipher)
+        self.assertEqual(first, second)
+        self.assertEqual(first, RC4("key").cipher("Hello world !"))
+        self.assertEqual(self.calls, 1)
+        self.assertEqual(self.cache.info()['hits'], 1)
+        self.assertEqual(self.cache.info()['misses'], 1)
+
+    def test_different_parameters(self):
+        self.cache.cached("rc4", {}, "key", "Hello", self.cipher)
+        self.cache.cached("rc4", {}, "other key", "Hello", self.cipher)
+        self.cache.cached("rc4", {'drop': 1}, "key", "Hello", self.cipher)
+        self.cache.cached("rc4", {}, "key", "Hello !", self.cipher)
+        self.assertEqual(self.calls, 4)
+
+    def test_bytes_output(self):
+        # CTR with a fixed nonce is deterministic (ECB isn't: random padding)
+        threefish = Threefish(32, bytes(range(48)))
+        threefish.key_schedule()
+        ctr = ThreefishCTR(threefish, bytes(24))
+        data = bytes(range(100))
+        parameters = {'block_size': 32, 'mode': 'CTR', 'nonce': ctr.nonce}
+        ciphertext = self.cache.cached("threefish", parameters, threefish.key, data, ctr.cipher)
+        self.assertEqual(ciphertext, ctr.cipher(data))
+        self.assertEqual(self.cache.cached("threefish", parameters, threefish.key, data, None),
+                         ciphertext)
+
+    def test_lru_eviction(self):
+        # only 2 outputs fit in the cache
+        for i in range(2):
+            self.cache.cached("test", {}, "key", bytes([i]), lambda data: data * 400)
+        # the first output is used, the second one is the least recently used
+        self.cache.cached("test", {}, "key", bytes([0]), None)
+        self.cache.cached("test", {}, "key", bytes([2]), lambda data: data * 400)
+        self.assertEqual(self.cache.info()['evictions'], 1)
+        self.assertEqual(self.cache.info()['entries'], 2)
+        self.assertLessEqual(self.cache.info()['size'], 1000)
+        self.assertIsNotNone(self.cache.get(CipherCache.entry_key("test", {}, "key", bytes([0]))))
+        self.assertIsNone(self.cache.get(CipherCache.entry_key("test", {}, "key", bytes([1]))))
+
+    def test_persistent(self):
+        self.cache.cached("rc4", {}, "key", "Hello", self.cipher)
+        cache = CipherCache(self.directory.name, max_size=1000)
+        cache.cached("rc4", {}, "key", "Hello", self.cipher)
+        self.assertEqual(self.calls, 1)
+        cache.clear()
+        self.assertEqual(cache.info()['entries'], 0)
+
+    def test_other_files_kept(self):
+        # files of the user in the directory of the cache
+        names = ["notes.txt", "draft.tmp", "0" * 40, "0" * 40 + ".tmp"]
+        for name in names:
+            with open(os.path.join(self.directory.name, name), "wb") as f:
+                f.write(bytes(2000))
+        cache = CipherCache(self.directory.name, max_size=1000)
+        self.assertEqual(cache.info()['entries'], 0)
+        for i in range(3):
+            cache.cached("test", {}, "key", bytes([i]), lambda data: data * 400)
+        cache.clear()
+        self.assertEqual(sorted(os.listdir(self.directory.name)), sorted(names))
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,90 @@
+import io
+import unittest
+
+from src.DES import DES
+
+class TestDES(unittest.TestCase):
+
+    def test_known_answer(self):
+        # FIPS 46-3 example
+        des = DES(0x133457799BBCDFF1)
+        self.assertEqual(des.cipher(0x0123456789ABCDEF), 0x85E813540F0AB405)
+
+    def test_known_answer_zero(self):
+        des = DES(bytes.fromhex("0E329232EA6D0D73"))
+        self.assertEqual(des.cipher(bytes.fromhex("8787878787878787")), bytes(8))
+
+    def test_bit_string(self):
+        des = DES(format(0x133457799BBCDFF1, '064b'))
+        ciphertext = des.cipher(format(0x0123456789ABCDEF, '064b'))
+        self.assertEqual(ciphertext, format(0x85E813540F0AB405, '064b'))
+
+    def test_substitution(self):
+        # each S-box reads its own 6 bits
+        self.assertEqual(DES.substitution(0x6117BA866527), 0x5C82B597)
+
+    def test_sp_tables(self):
+        # F with the SP tables == expansion, key mixing, S-boxes and P
+        des = DES(0x133457799BBCDFF1)
+        block = 0xF0AAF0AA
+        for subkey in des.subkeys:
+            expected = DES.permutation(DES.substitution(DES.key_mixing(subkey, DES.expansion(block))))
+            self.assertEqual(des.F(subkey, block), expected)
+
+    def test_subkeys(self):
+        des = DES(0x133457799BBCDFF1)
+        self.assertEqual(len(des.subkeys), 16)
+        self.assertEqual(des.subkeys[0], 0b000110110000001011101111111111000111000001110010)
+        self.assertEqual(des.subkeys[15], 0b110010110011110110001011000011100001011111110101)
+
+    def test_decipher_block(self):
+        des = DES(0x133457799BBCDFF1)
+        self.assertEqual(des.decipher(0x85E813540F0AB405), 0x0123456789ABCDEF)
+        self.assertEqual(des.decipher(des.cipher(b"abcdefgh")), b"abcdefgh")
+
+    def test_modes(self):
+        des = DES(b"8bytekey")
+        IV = bytes(range(8))
+        for length in (0, 1, 7, 8, 9, 100):
+            text = bytes(range(length))
+            for mode in DES.MODES:
+                ciphertext = des.cipher_bytes(text, mode, None if mode == 'ECB' else IV)
+                if mode == 'CTR':
+                    self.assertEqual(len(ciphertext), length)
+                else:
+                    self.assertEqual(len(ciphertext), (length // 8 + 1) * 8)
+                self.assertEqual(des.decipher_bytes(ciphertext, mode, None if mode == 'ECB' else IV),
+                                 text)
+
+    def test_cbc_known_answer(self):
+        # NIST SP 800-17 / FIPS 81 example
+        des = DES(0x0123456789ABCDEF)
+        IV = 0x1234567890ABCDEF
+        blocks = [0x4E6F772069732074, 0x68652074696D6520, 0x666F7220616C6C20]
+        self.assertEqual(des.cipher_words(blocks, 'CBC', IV)[0],
+                         [0xE5C7CDDE872BF27C, 0x43E934008C389C0F, 0x683788499A7C05F6])
+
+    def test_ctr_keystream(self):
+        des = DES(0x0123456789ABCDEF)
+        ciphertext = des.cipher_bytes(bytes(16), 'CTR', 5)
+        self.assertEqual(ciphertext, des.cipher(b'\0' * 7 + b'\5') + des.cipher(b'\0' * 7 + b'\6'))
+
+    def test_stream_chunks(self):
+        des = DES(b"8bytekey")
+        text = bytes(range(256)) * 4
+        for mode in DES.MODES:
+            encryptor = des.encryptor(mode, 42)
+            ciphertext = b''.join(encryptor.update(text[i:i+7]) for i in range(0, len(text), 7))
+            ciphertext += encryptor.finalize()
+            decrypted = io.BytesIO()
+            des.decipher_file(io.BytesIO(ciphertext), decrypted, mode, 42)
+            self.assertEqual(decrypted.getvalue(), text)
+
+    def test_truncated(self):
+        des = DES(b"8bytekey")
+        ciphertext = des.cipher_bytes(b"Hello world !")
+        self.assertRaises(ValueError, des.decipher_bytes, ciphertext[:-1])
+        self.assertRaises(ValueError, des.encryptor, 'CBC')
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,47 @@
+import unittest
+
+from src.DES import DES
+from src.DESBitslice import DESBitslice
+
+class TestDESBitslice(unittest.TestCase):
+
+    def setUp(self):
+        self.des = DES(0x133457799BBCDFF1)
+        self.blocks = [(0x0123456789ABCDEF * i) & 0xffffffffffffffff for i in range(150)]
+
+    def test_transpose(self):
+        slices = DESBitslice.transpose(self.blocks[:64])
+        self.assertEqual(len(slices), 64)
+        self.assertEqual(DESBitslice.untranspose(slices, 64), self.blocks[:64])
+
+    def test_same_as_scalar(self):
+        # several passes, the last one incomplete
+        bitslice = DESBitslice(self.des, width=64)
+        ciphered = bitslice.encrypt_blocks(self.blocks)
+        self.assertEqual(ciphered, [self.des.encrypt_block(block) for block in self.blocks])
+        self.assertEqual(bitslice.decrypt_blocks(ciphered), self.blocks)
+
+    def test_known_answer(self):
+        self.assertEqual(DESBitslice(self.des).encrypt_blocks([0x0123456789ABCDEF]),
+                         [0x85E813540F0AB405])
+
+    def test_ctr(self):
+        data = bytes(range(256)) * 10 + b"end"
+        bitslice = DESBitslice(self.des)
+        self.assertEqual(bitslice.cipher_ctr(data, 7), self.des.cipher_bytes(data, 'CTR', 7))
+
+    def test_automatic_backend(self):
+        data = bytes(range(256)) * 20
+        for mode in DES.MODES:
+            IV = None if mode == 'ECB' else 3
+            ciphertext = self.des.cipher_bytes(data, mode, IV)
+            self.assertEqual(self.des.decipher_bytes(ciphertext, mode, IV), data)
+        # same blocks as the scalar engine (the padding block is random)
+        scalar = DES(0x133457799BBCDFF1)
+        scalar.BITSLICE_BLOCKS = len(data)
+        self.assertEqual(self.des.cipher_bytes(data)[:len(data)],
+                         scalar.cipher_bytes(data)[:len(data)])
+        self.assertEqual(self.des.cipher_bytes(data, 'CTR', 3), scalar.cipher_bytes(data, 'CTR', 3))
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,6 +1,7 @@
 import unittest
 import src._utils as utils
-from src.Feistel import Feistel
+from src.Feistel import Feistel, FeistelNetwork
+from src.DES import DES
 
 class TestFeistel(unittest.TestCase):
 
@@ -22,5 +23,34 @@ class TestFeistel(unittest.TestCase):
 
         self.assertEqual(feist.run(3), output)
 
+    def test_network_course_case(self):
+        # the same case on integers: F is the sum of the subkey and the half
+        # block, on 16 bits, and the subkeys are the key rotated by 2, 4 and 6
+        K = 0b1100000000111111
+        subkeys = [((K << r) | (K >> (16 - r))) & 0xffff for r in (2, 4, 6)]
+        network = FeistelNetwork(16, lambda k, d: (k + d) & 0xffff, subkeys)
+        M = 0b01000111010100110011000100110101
+        # the Feistel class doesn't swap the halves back after the last round
+        output = 0b00101101001000010100100001010110
+        self.assertEqual(network.encrypt(M), output)
+        self.assertEqual(network.decrypt(output), M)
+
+    def test_network_batch(self):
+        network = FeistelNetwork(8, lambda k, d: ((d * 7) ^ k) & 0xff, [3, 141, 59, 26])
+        blocks = list(range(0, 1 << 16, 257))
+        ciphered = network.encrypt_blocks(blocks)
+        self.assertEqual(ciphered, [network.encrypt(block) for block in blocks])
+        self.assertEqual(network.decrypt_blocks(ciphered), blocks)
+
+    def test_des_network(self):
+        # the inlined rounds of DES are the generic rounds with DES's F
+        des = DES(0x133457799BBCDFF1)
+        generic = FeistelNetwork(32, DES.round_function, des.subkeys_pieces)
+        for block in (0, 0x0123456789ABCDEF, 0xFFFFFFFFFFFFFFFF):
+            self.assertEqual(des.network.encrypt(block), generic.encrypt(block))
+            self.assertEqual(des.network.decrypt(block), generic.decrypt(block))
+        self.assertEqual(des.encrypt_blocks([0x0123456789ABCDEF]), [0x85E813540F0AB405])
+        self.assertEqual(des.decrypt_blocks([0x85E813540F0AB405]), [0x0123456789ABCDEF])
+
 if __name__ == '__main__':
     unittest.main()
@@ -0,0 +1,37 @@
+import hashlib
+import hmac
+import unittest
+
+from src.HMAC import HMAC
+
+class TestHMAC(unittest.TestCase):
+
+    def test_same_as_hmac(self):
+        message = b"Lorem ipsum dolor sit amet" * 10
+        for key in (b"", b"key", bytes(range(64)), bytes(range(100))):
+            self.assertEqual(HMAC(key, message).digest(),
+                             hmac.new(key, message, 'sha1').digest())
+
+    def test_rfc_2202(self):
+        self.assertEqual(HMAC(b"Jefe", b"what do ya want for nothing?").hexdigest(),
+                         "effcdf6ae5eb2fa2d27416d5f184df9c259a7c79")
+
+    def test_update_and_copy(self):
+        mac = HMAC(b"key", b"common ")
+        other = mac.copy()
+        mac.update(b"first")
+        other.update(b"second")
+        self.assertEqual(mac.digest(), hmac.new(b"key", b"common first", 'sha1').digest())
+        self.assertEqual(other.digest(), hmac.new(b"key", b"common second", 'sha1').digest())
+        self.assertEqual(mac.sign(b"message"), hmac.new(b"key", b"message", 'sha1').digest())
+
+    def test_pbkdf2(self):
+        for iterations, dklen in ((1, 20), (2, 20), (4096, 20), (100, 48)):
+            self.assertEqual(HMAC.pbkdf2(b"password", b"salt", iterations, dklen),
+                             hashlib.pbkdf2_hmac('sha1', b"password", b"salt", iterations, dklen))
+
+    def test_pbkdf2_iterations(self):
+        self.assertRaises(ValueError, HMAC.pbkdf2, b"password", b"salt", 0)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,31 @@
+import hashlib
+import unittest
+
+from src.SHA1 import SHA1
+from src.SHA1Batch import SHA1Batch
+
+@unittest.skipUnless(SHA1Batch.available(), "NumPy is not installed")
+class TestSHA1Batch(unittest.TestCase):
+
+    def test_same_as_hashlib(self):
+        # different numbers of blocks, so some lanes are masked
+        data = bytes(range(256)) * 2
+        messages = [data[:length] for length in (0, 1, 55, 56, 64, 100, 128, 300)]
+        self.assertEqual(SHA1Batch().digests(messages),
+                         [hashlib.sha1(message).digest() for message in messages])
+
+    def test_one_long_message(self):
+        # the lanes are sorted by length: the digests keep the order of the messages
+        messages = [b"a", bytes(range(256)) * 40, b"", b"record" * 20, b"b"]
+        self.assertEqual(SHA1Batch().digests(messages),
+                         [hashlib.sha1(message).digest() for message in messages])
+
+    def test_same_as_scalar(self):
+        messages = ["Hello world !", "Lorem ipsum dolor sit amet"]
+        self.assertEqual(SHA1Batch().hash(messages), [SHA1().hash(m) for m in messages])
+
+    def test_no_message(self):
+        self.assertEqual(SHA1Batch().hash([]), [])
+
+if __name__ == '__main__':
+    unittest.main()
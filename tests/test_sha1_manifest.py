@@ -0,0 +1,65 @@
+import os
+import hashlib
+import tempfile
+import unittest
+
+from src.SHA1Manifest import SHA1Manifest
+
+class TestSHA1Manifest(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.root = self.directory.name
+        os.makedirs(os.path.join(self.root, "sub"))
+        for i, name in enumerate(("a", "b", "sub/c")):
+            self.write(name, bytes([i]) * (100 * i))
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def write(self, name, data, mtime=None):
+        path = os.path.join(self.root, name)
+        with open(path, "wb") as f:
+            f.write(data)
+        os.utime(path, ns=(mtime or 10**18, mtime or 10**18))
+
+    def test_build(self):
+        manifest = SHA1Manifest(self.root)
+        manifest.build(workers=2)
+        self.assertEqual(sorted(manifest.entries), ["a", "b", "sub/c"])
+        self.assertEqual(manifest.entries["sub/c"]['sha1'], hashlib.sha1(bytes([2]) * 200).hexdigest())
+        self.assertEqual(manifest.entries["b"]['size'], 100)
+        self.assertEqual(manifest.stats['files'], 3)
+        self.assertEqual(manifest.stats['bytes'], 300)
+
+    def test_verify_incremental(self):
+        manifest = SHA1Manifest(self.root)
+        manifest.build(workers=1)
+        path = os.path.join(self.root, "manifest.json")
+        manifest.save(path)
+        manifest = SHA1Manifest.load(path)
+        os.remove(path)
+
+        # b is modified with the same size and mtime: not hashed again
+        self.write("b", bytes([9]) * 100)
+        self.write("sub/c", bytes([9]) * 200, mtime=2 * 10**18)
+        os.remove(os.path.join(self.root, "a"))
+        self.write("d", b"new")
+        result = manifest.verify(workers=1)
+        self.assertEqual(result, {'ok': ["b"], 'modified': ["sub/c"], 'missing': ["a"], 'new': ["d"]})
+        self.assertEqual(manifest.stats['files'], 2)
+
+        # full verification hashes all the files
+        self.assertEqual(manifest.verify(workers=1, full=True)['modified'], ["b", "sub/c"])
+
+    def test_verify_update(self):
+        manifest = SHA1Manifest(self.root)
+        manifest.build(workers=1)
+        self.write("a", b"changed", mtime=2 * 10**18)
+        manifest.verify(workers=1, update=True)
+        result = manifest.verify(workers=1)
+        self.assertEqual(result['ok'], ["a", "b", "sub/c"])
+        self.assertEqual(manifest.stats['files'], 0)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,190 @@
+import io
+import os
+import tempfile
+import unittest
+
+from src.Threefish import Threefish, KeyScheduleCache
+from tests._helpers import (assert_thread_safe, create_threefish)
+
+class TestThreefish(unittest.TestCase):
+
+    def setUp(self):
+        self.text = b"Lorem ipsum dolor sit amet, consectetur adipisicing elit, sed do eiusmod tempor incididunt ut labore et dolore magna aliqua."
+
+    def test_mix_inv(self):
+        m1, m2 = 0x0123456789abcdef, 0xfedcba9876543210
+        self.assertEqual(Threefish.mix_inv(*Threefish.mix(m1, m2)), (m1, m2))
+
+    def test_known_answer_256(self):
+        threefish = create_threefish(32)
+        self.assertEqual(threefish.encrypt_block([0, 1, 2, 3]),
+                         [0x7a168b72dc486c83, 0x130caddc8ccb11eb,
+                          0x228e0ccef2afbbec, 0x4ac4a5bf5956b100])
+
+    def test_known_answer_512(self):
+        threefish = create_threefish(64)
+        self.assertEqual(threefish.encrypt_block(list(range(8))),
+                         [0x7c83071318e183a6, 0xaefd342b89dc4763,
+                          0x28535e643cff0e7c, 0xbb047b0f6dff3d63,
+                          0x453827510d5466b4, 0x50326dca988a9063,
+                          0x51e9d1fb2e499925, 0x1f0fd50f5d0c1ccc])
+
+    def test_generated_rounds(self):
+        for block_size in (32, 64, 128):
+            threefish = create_threefish(block_size)
+            block = list(range(1, block_size // 8 + 1))
+            # reference: the rounds step by step
+            expected = block
+            for j in range(Threefish.NB_ROUNDS-1):
+                if j % 4 == 0:
+                    expected = Threefish.xor_with_block(expected, threefish.rounds_keys[j//4])
+                expected = Threefish.threefish_round(expected)
+            expected = Threefish.xor_with_block(expected, threefish.rounds_keys[-1])
+            expected = Threefish.threefish_round(expected)
+            self.assertEqual(threefish.encrypt_block(block), expected)
+            self.assertEqual(threefish.decrypt_block(expected), block)
+
+    def test_key_schedule_independent_instances(self):
+        other = Threefish(64, bytes(range(1, 81)))
+        other.key_schedule()
+        self.test_known_answer_256()
+        self.assertEqual(Threefish.C, 0x1bd11bdaa9fc1a22)
+
+    def test_schedule_cache(self):
+        cache = KeyScheduleCache(maxsize=2)
+        tweaks = [1, 2, 3]
+        first = cache.get(32, bytes(32), tweaks)
+        self.assertIs(cache.get(32, bytes(32), tweaks), first)
+        cache.get(32, bytes(range(32)), tweaks)
+        cache.get(64, bytes(64), tweaks)
+        self.assertIsNot(cache.get(32, bytes(32), tweaks), first)
+        self.assertEqual(cache.info(), {'hits': 1, 'misses': 4, 'size': 2, 'maxsize': 2})
+
+    def test_blockify_words(self):
+        text = bytes(range(64))
+        blocks = Threefish.blockify(text, 32)
+        self.assertEqual(len(blocks), 2)
+        self.assertEqual(blocks[0][0], 0x0001020304050607)
+        self.assertEqual(blocks[1][3], 0x38393a3b3c3d3e3f)
+
+    def test_encrypt_block_inverse(self):
+        threefish = create_threefish(64)
+        block = list(range(8))
+        self.assertEqual(threefish.decrypt_block(threefish.encrypt_block(block)), block)
+
+    def test_ciphertext_length(self):
+        for block_size in (32, 64, 128):
+            threefish = create_threefish(block_size)
+            for _ in range(20):
+                self.assertEqual(len(threefish.cipher(self.text)) % block_size, 0)
+
+    def test_ecb(self):
+        for block_size in (32, 64, 128):
+            threefish = create_threefish(block_size)
+            ciphertext = threefish.cipher(self.text)
+            self.assertEqual(threefish.decipher(ciphertext), self.text)
+
+    def test_cbc(self):
+        for block_size in (32, 64, 128):
+            threefish = create_threefish(block_size)
+            IV = bytes(range(100, 100 + block_size))
+            ciphertext = threefish.cipher(self.text, IV)
+            self.assertEqual(threefish.decipher(ciphertext, IV), self.text)
+
+    def test_stream_chunks(self):
+        threefish = create_threefish(32)
+        IV = bytes(range(32))
+        encryptor = threefish.encryptor(IV)
+        ciphertext = b''.join(encryptor.update(self.text[i:i+7])
+                              for i in range(0, len(self.text), 7))
+        ciphertext += encryptor.finalize()
+        decryptor = threefish.decryptor(IV)
+        plaintext = b''.join(decryptor.update(ciphertext[i:i+13])
+                             for i in range(0, len(ciphertext), 13))
+        plaintext += decryptor.finalize()
+        self.assertEqual(plaintext, self.text)
+        self.assertEqual(threefish.decipher(ciphertext, IV), self.text)
+
+    def test_stream_block_aligned(self):
+        threefish = create_threefish(32)
+        text = bytes(range(64))
+        ciphertext = threefish.cipher(text)
+        self.assertEqual(len(ciphertext), 96)
+        decryptor = threefish.decryptor()
+        self.assertEqual(decryptor.update(ciphertext[:64]), b'')
+        self.assertEqual(decryptor.update(ciphertext[64:]), text[:32])
+        self.assertEqual(decryptor.finalize(), text[32:])
+
+    def test_padding_on_2_blocks(self):
+        threefish = create_threefish(32)
+        # 31 bytes: no room for the 2 bytes of padding size in the first block
+        text = bytes(range(31))
+        ciphertext = threefish.cipher(text)
+        self.assertEqual(len(ciphertext), 64)
+        decryptor = threefish.decryptor()
+        plaintext = b''.join(decryptor.update(ciphertext[i:i+1]) for i in range(64))
+        self.assertEqual(plaintext + decryptor.finalize(), text)
+
+    def test_stream_truncated(self):
+        threefish = create_threefish(32)
+        decryptor = threefish.decryptor()
+        decryptor.update(threefish.cipher(self.text)[:-1])
+        self.assertRaises(ValueError, decryptor.finalize)
+
+    def test_file(self):
+        threefish = create_threefish(64)
+        IV = bytes(range(64))
+        text = self.text * 1000
+        ciphered = io.BytesIO()
+        threefish.cipher_file(io.BytesIO(text), ciphered, IV)
+        deciphered = io.BytesIO()
+        threefish.decipher_file(io.BytesIO(ciphered.getvalue()), deciphered, IV)
+        self.assertEqual(deciphered.getvalue(), text)
+
+    def test_parallel_ecb(self):
+        threefish = create_threefish(32)
+        text = self.text * 10
+        ciphertext = threefish.cipher_parallel(text, workers=2, shard_blocks=4)
+        self.assertEqual(threefish.decipher(ciphertext), text)
+        self.assertEqual(threefish.decipher_parallel(ciphertext, workers=2, shard_blocks=3), text)
+
+    def test_parallel_cbc_decipher(self):
+        threefish = create_threefish(64)
+        IV = bytes(range(64))
+        text = self.text * 10
+        ciphertext = threefish.cipher(text, IV)
+        self.assertEqual(threefish.decipher_parallel(ciphertext, IV, workers=2, shard_blocks=5),
+                         text)
+
+    def test_parallel_threads(self):
+        # without processes, the shards are ciphered with the caller's instance
+        text = self.text * 4
+        def create(seed):
+            threefish = create_threefish(32, seed)
+            def check():
+                ciphertext = threefish.cipher_parallel(text, workers=1, shard_blocks=1)
+                return (threefish.decipher(ciphertext) == text
+                        and threefish.decipher_parallel(ciphertext, workers=1,
+                                                        shard_blocks=1) == text)
+            return check
+        assert_thread_safe(self, create)
+
+    def test_file_mmap(self):
+        threefish = create_threefish(32)
+        IV = bytes(range(32))
+        text = self.text * 1000
+        with tempfile.TemporaryDirectory() as directory:
+            paths = [os.path.join(directory, name) for name in ('plain', 'cipher', 'decipher')]
+            with open(paths[0], 'wb') as f:
+                f.write(text)
+            for iv in (None, IV):
+                threefish.cipher_file_mmap(paths[0], paths[1], iv, region_size=4096)
+                with open(paths[1], 'rb') as f:
+                    self.assertEqual(threefish.decipher(f.read(), iv), text)
+                threefish.decipher_file_mmap(paths[1], paths[2], iv, workers=2,
+                                             region_size=4096)
+                with open(paths[2], 'rb') as f:
+                    self.assertEqual(f.read(), text)
+
+if __name__ == '__main__':
+    unittest.main()
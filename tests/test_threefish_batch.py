@@ -0,0 +1,49 @@
+import unittest
+
+from src.ThreefishBatch import ThreefishBatch
+from src.ThreefishCTR import ThreefishCTR
+from tests._helpers import create_threefish
+
+@unittest.skipUnless(ThreefishBatch.available(), "NumPy is not installed")
+class TestThreefishBatch(unittest.TestCase):
+
+    def setUp(self):
+        self.text = bytes(range(256)) * 20
+
+    def test_round_inverse(self):
+        threefish = create_threefish(64)
+        batch = ThreefishBatch(threefish)
+        blocks = batch.load(self.text)
+        self.assertTrue((batch.threefish_round_inv(batch.threefish_round(blocks)) == blocks).all())
+
+    def test_ecb_same_as_scalar(self):
+        for block_size in (32, 64, 128):
+            threefish = create_threefish(block_size)
+            data = self.text[:len(self.text) - len(self.text) % block_size]
+            scalar = threefish.cipher_blocks(threefish.blockify(data, block_size))[0]
+            self.assertEqual(ThreefishBatch(threefish).cipher(data), scalar)
+
+    def test_cbc_decipher_same_as_scalar(self):
+        threefish = create_threefish(32)
+        IV = bytes(range(32))
+        ciphertext = threefish.cipher(self.text, IV)
+        previous = threefish.blockify(IV, 32)[0]
+        scalar = threefish.decipher_blocks(threefish.blockify(ciphertext, 32), previous)[0]
+        self.assertEqual(ThreefishBatch(threefish).decipher(ciphertext, previous), scalar)
+
+    def test_automatic_backend(self):
+        threefish = create_threefish(32)
+        self.assertTrue(threefish.use_batch(len(self.text) // 32))
+        ciphertext = threefish.cipher(self.text)
+        self.assertEqual(threefish.decipher(ciphertext), self.text)
+        IV = bytes(range(32))
+        self.assertEqual(threefish.decipher(threefish.cipher(self.text, IV), IV), self.text)
+
+    def test_ctr_same_as_scalar(self):
+        ctr = ThreefishCTR(create_threefish(64), bytes(56))
+        batch = ThreefishBatch(ctr.threefish).keystream(ctr.nonce_words, 5, 100)
+        scalar = b''.join(ctr.keystream_blocks(counter, 1) for counter in range(5, 105))
+        self.assertEqual(batch, scalar)
+
+if __name__ == '__main__':
+    unittest.main()
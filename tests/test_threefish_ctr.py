@@ -0,0 +1,52 @@
+import io
+import unittest
+
+from src.Threefish import Threefish
+from src.ThreefishCTR import ThreefishCTR
+from tests._helpers import assert_thread_safe
+
+class TestThreefishCTR(unittest.TestCase):
+
+    def setUp(self):
+        self.text = b"Lorem ipsum dolor sit amet, consectetur adipisicing elit, sed do eiusmod tempor incididunt ut labore et dolore magna aliqua." * 5
+        threefish = Threefish(32, bytes(range(48)))
+        threefish.key_schedule()
+        self.ctr = ThreefishCTR(threefish, bytes(range(24)))
+
+    def test_no_padding(self):
+        self.assertEqual(len(self.ctr.cipher(self.text)), len(self.text))
+
+    def test_decipher(self):
+        self.assertEqual(self.ctr.decipher(self.ctr.cipher(self.text)), self.text)
+
+    def test_keystream_blocks(self):
+        threefish = self.ctr.threefish
+        block = threefish.encrypt_block(self.ctr.nonce_words + [3])
+        self.assertEqual(self.ctr.keystream_blocks(3, 1), threefish.block_struct.pack(*block))
+
+    def test_decrypt_range(self):
+        ciphertext = self.ctr.cipher(self.text)
+        for offset, length in ((0, 10), (5, 40), (31, 2), (100, 300)):
+            expected = self.text[offset:offset + length]
+            self.assertEqual(self.ctr.decrypt_range(ciphertext, offset, length), expected)
+            self.assertEqual(self.ctr.decrypt_range(io.BytesIO(ciphertext), offset, length),
+                             expected)
+
+    def test_parallel(self):
+        ciphertext = self.ctr.cipher(self.text)
+        self.assertEqual(self.ctr.cipher(self.text, workers=2, shard_blocks=3), ciphertext)
+
+    def test_threads(self):
+        def create(seed):
+            threefish = Threefish(32, bytes(range(seed, seed + 48)))
+            threefish.key_schedule()
+            ctr = ThreefishCTR(threefish, bytes(24))
+            expected = ctr.keystream_blocks(0, 64)
+            return lambda: ctr.keystream(0, 2048, workers=1, shard_blocks=1) == expected
+        assert_thread_safe(self, create, calls=50)
+
+    def test_wrong_nonce(self):
+        self.assertRaises(ValueError, ThreefishCTR, self.ctr.threefish, bytes(32))
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,74 @@
+import io
+import unittest
+
+from src.Threefish import Threefish
+from src.ThreefishSector import ThreefishSector
+from tests._helpers import assert_thread_safe
+
+class TestThreefishSector(unittest.TestCase):
+
+    def setUp(self):
+        self.sectors = ThreefishSector(32, bytes(range(32)), sector_size=128)
+        self.image = bytes(range(256)) * 4
+
+    def test_rounds_keys(self):
+        # same rounds keys as a key schedule with the tweaks of the block
+        threefish = Threefish(32, bytes(range(32)) + (5).to_bytes(8, 'big') + (3).to_bytes(8, 'big'))
+        self.assertEqual(self.sectors.rounds_keys(5, 3),
+                         Threefish.generate_rounds_keys(32, threefish.key, threefish.tweaks))
+
+    def test_tweaks_added_while_running(self):
+        # same blocks as Threefish with the rounds keys of each block
+        threefish = self.sectors.threefish
+        blocks = Threefish.blockify(self.image[:128], 32)
+        expected = b''.join(threefish.block_struct.pack(
+            *threefish.encrypt_block(block, self.sectors.rounds_keys(7, i)))
+            for i, block in enumerate(blocks))
+        self.assertEqual(self.sectors.cipher_sector(7, self.image[:128]), expected)
+
+    def test_decipher(self):
+        ciphertext = self.sectors.cipher(self.image)
+        self.assertEqual(len(ciphertext), len(self.image))
+        self.assertEqual(self.sectors.decipher(ciphertext), self.image)
+
+    def test_blocks_are_different(self):
+        # the same plaintext gives different ciphertexts in each block and sector
+        ciphertext = self.sectors.cipher(bytes(len(self.image)))
+        blocks = [ciphertext[i:i+32] for i in range(0, len(ciphertext), 32)]
+        self.assertEqual(len(set(blocks)), len(blocks))
+
+    def test_random_access(self):
+        ciphertext = self.sectors.cipher(self.image)
+        self.assertEqual(self.sectors.decipher_sector(3, ciphertext[384:512]), self.image[384:512])
+        self.assertEqual(self.sectors.read_sectors(io.BytesIO(ciphertext), 2, 2),
+                         self.image[256:512])
+
+    def test_write_sectors(self):
+        image = io.BytesIO(self.sectors.cipher(self.image))
+        self.sectors.write_sectors(image, 1, bytes(128))
+        expected = self.image[:128] + bytes(128) + self.image[256:]
+        self.assertEqual(self.sectors.decipher(image.getvalue()), expected)
+
+    def test_parallel(self):
+        ciphertext = self.sectors.cipher(self.image)
+        self.assertEqual(self.sectors.cipher(self.image, workers=2, shard_sectors=3), ciphertext)
+
+    def test_from_rounds_keys(self):
+        sectors = ThreefishSector.from_rounds_keys(32, self.sectors.base_rounds_keys, 128)
+        ciphertext = self.sectors.cipher(self.image)
+        self.assertEqual(sectors.cipher(self.image), ciphertext)
+        self.assertEqual(sectors.decipher(ciphertext), self.image)
+
+    def test_threads(self):
+        sector = self.image[:128]
+        def create(seed):
+            sectors = ThreefishSector(32, bytes(range(seed, seed + 32)), sector_size=128)
+            expected = sectors.cipher_sector(0, sector)
+            return lambda: sectors.cipher(sector) == expected
+        assert_thread_safe(self, create, calls=50)
+
+    def test_wrong_sector_size(self):
+        self.assertRaises(ValueError, ThreefishSector, 32, bytes(32), 100)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,59 @@
+import unittest
+
+from src.DES import (DES, DESModes)
+from src.TripleDES import TripleDES
+
+class TestTripleDES(unittest.TestCase):
+
+    def setUp(self):
+        self.keys = (0x0123456789ABCDEF, 0x23456789ABCDEF01, 0x456789ABCDEF0123)
+        self.tdes = TripleDES(self.keys)
+
+    def test_known_answer(self):
+        # NIST SP 800-67 example
+        plaintext = b"The qufck brown fox jump"
+        self.assertEqual(self.tdes.cipher_bytes(plaintext)[:24].hex().upper(),
+                         "A826FD8CE53B855FCCE21C8112256FE668D5C05DD9B6B900")
+
+    def test_fused_same_as_3_des(self):
+        des1, des2, des3 = (DES(key) for key in self.keys)
+        block = 0x0123456789ABCDEF
+        expected = des3.encrypt_block(des2.decrypt_block(des1.encrypt_block(block)))
+        self.assertEqual(self.tdes.encrypt_block(block), expected)
+        self.assertEqual(self.tdes.decrypt_block(expected), block)
+
+    def test_same_key_is_des(self):
+        key = 0x133457799BBCDFF1
+        self.assertEqual(TripleDES((key, key)).cipher(0x0123456789ABCDEF), 0x85E813540F0AB405)
+
+    def test_two_keys(self):
+        tdes = TripleDES(bytes(range(16)))
+        self.assertEqual(tdes.key, (0x0001020304050607, 0x08090a0b0c0d0e0f, 0x0001020304050607))
+        self.assertIs(tdes.stages[0], tdes.stages[2])
+        self.assertIs(TripleDES(bytes(range(16))).stages[0], tdes.stages[0])
+
+    def test_modes(self):
+        IV = bytes(range(8))
+        for data in (b"Hello world !", bytes(range(256)) * 10):
+            for mode in DES.MODES:
+                iv = None if mode == 'ECB' else IV
+                ciphertext = self.tdes.cipher_bytes(data, mode, iv)
+                self.assertEqual(self.tdes.decipher_bytes(ciphertext, mode, iv), data)
+
+    def test_batch_same_as_blocks(self):
+        blocks = list(range(300))
+        self.assertEqual(self.tdes.encrypt_batch(blocks),
+                         [self.tdes.encrypt_block(block) for block in blocks])
+
+    def test_modes_shared_with_des(self):
+        # Triple DES has the modes of DES, not its key schedule and rounds
+        self.assertNotIsInstance(self.tdes, DES)
+        self.assertIsInstance(self.tdes, DESModes)
+        self.assertFalse(hasattr(self.tdes, 'bitslice'))
+
+    def test_wrong_key(self):
+        self.assertRaises(ValueError, TripleDES, bytes(8))
+        self.assertRaises(ValueError, TripleDES, (1,))
+
+if __name__ == '__main__':
+    unittest.main()